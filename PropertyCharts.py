@@ -0,0 +1,252 @@
+"""
+T-s, P-h and h-s charts for steam: saturation dome, isobars, isotherms and quality lines, with states marked on top.
+The lines are worked out in one ThermoBatch.setStates call per unit system and cached (isolines), so they only get
+computed once, and that can happen on a worker thread while the window is already up.
+propertyChart draws them on a matplotlib Figure once, then showStates only repaints the state markers (blitting
+over a saved copy of the background) instead of redrawing every line.
+"""
+
+#region imports
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+from SteamTables import steamTables
+from ThermoBatch import setStates
+import StateSolvers
+from UnitConversion import UC
+#endregion
+
+#region chart setup
+# chart name -> (x property, y property, log y axis)
+CHARTS = {'T-s': ('s', 't', False), 'P-h': ('h', 'p', True), 'h-s': ('s', 'h', False)}
+axisNames = {'p': "Pressure", 't': "Temperature", 'h': "Enthalpy", 's': "Entropy"}
+
+# isobars and isotherms to draw, in the units of each system
+levels = {'SI': {'p': [0.01, 0.1, 1.0, 10.0, 50.0, 100.0, 200.0, 400.0],
+                 't': [50.0, 100.0, 200.0, 300.0, 400.0, 500.0, 600.0, 700.0]},
+          'EN': {'p': [0.2, 1.0, 14.7, 100.0, 500.0, 1000.0, 3000.0, 6000.0],
+                 't': [100.0, 200.0, 400.0, 600.0, 800.0, 1000.0, 1200.0]}}
+qualities = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+#endregion
+
+class chartLines:
+    """
+    The background lines of a chart, each one a dict of p, t, h, s arrays:
+    dome (liquid line then vapor line back down), isobars and isotherms as (value, line) lists, qualities the same
+    """
+    def __init__(self, units, dome, isobars, isotherms, qualities):
+        self.units = units
+        self.dome = dome
+        self.isobars = isobars
+        self.isotherms = isotherms
+        self.qualities = qualities
+
+_isolineCache = {}  # (units, fast) -> chartLines
+
+class _quietThreads(logging.Filter):
+    """drops pyXSteam's warnings logged from the threads that asked for quiet, everybody else's get through"""
+    def __init__(self):
+        super().__init__()
+        self.threads = {}  # thread id -> nesting depth
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        return record.levelno >= logging.ERROR or record.thread not in self.threads
+
+_quiet = _quietThreads()
+
+@contextmanager
+def _quietPyXSteam():
+    """
+    pyXSteam's range warnings off for the calling thread only, for the with block.  A filter on its loggers
+    instead of their level, so a GUI thread or another worker running at the same time still gets its warnings
+    """
+    names = ['pyXSteam'] + [name for name in logging.root.manager.loggerDict if name.startswith('pyXSteam.')]
+    me = threading.get_ident()
+    with _quiet.lock:
+        for name in names:
+            log = logging.getLogger(name)
+            if _quiet not in log.filters:
+                log.addFilter(_quiet)
+        _quiet.threads[me] = _quiet.threads.get(me, 0) + 1
+    try:
+        yield
+    finally:
+        with _quiet.lock:
+            _quiet.threads[me] -= 1
+            if not _quiet.threads[me]:
+                del _quiet.threads[me]
+
+def isolines(SI=True, fast=None, nPoints=80):
+    """
+    Dome, isobars, isotherms and quality lines for one unit system, computed once and cached
+    :param SI: True for SI units, False for english
+    :param fast: passed on to steamTables.sat
+    :param nPoints: points per line segment
+    :return: chartLines
+    """
+    units = 'SI' if SI else 'EN'
+    key = (units, bool(fast))
+    lines = _isolineCache.get(key)
+    if lines is None:
+        with _quietPyXSteam():  # some lines run past the critical point on purpose, no need for range warnings
+            lines = _isolineCache[key] = _computeIsolines(steamTables.sat(True, fast), units, nPoints)
+    return lines
+
+def _computeIsolines(steamTable, units, n):
+    """
+    builds every row of every line, runs them through setStates in one go and cuts the result back into lines.
+    The rows are all SI (steamTable is the SI table), the levels get converted in and the lines back out to units
+    """
+    st = steamTable
+    lim = StateSolvers.limits(st)
+    tTop = lim['tc'] - 1e-3 * (lim['tc'] - lim['tmin'])  # just under the critical point, the dome closes there
+    tDome = lim['tmin'] + (tTop - lim['tmin']) * (1 - np.geomspace(1, 1e-3, n) + 1e-3)  # bunched up near the top
+    rows = []  # (prop1, prop2, val1, val2) per point
+    segments = []  # (kind, value, start, stop)
+
+    def add(kind, value, prop1, prop2, val1, val2):
+        start = len(rows)
+        rows.extend(zip([prop1] * len(val1), [prop2] * len(val1), val1, val2))
+        segments.append((kind, value, start, len(rows)))
+
+    add('dome', None, 't', 'x', np.concatenate((tDome, tDome[::-1])), np.repeat([0.0, 1.0], n))
+    for x in qualities:
+        add('x', x, 't', 'x', tDome, np.full(n, x))
+    for pLabel in levels[units]['p']:
+        p = UC.convert(pLabel, 'p', units, 'SI')
+        if p < lim['pc']:
+            tsat = st.tsat_p(p)
+            tLiq = np.linspace(lim['tmin'], tsat - 0.2, n // 2)  # keep clear of the 0.1 two-phase tolerance
+            tVap = np.linspace(tsat + 0.2, lim['tmax'], n)
+            add('p', pLabel, 'p', 't', np.full(len(tLiq), p), tLiq)
+            start = segments.pop()[2]
+            rows.extend([('p', 'x', p, 0.0), ('p', 'x', p, 1.0)])  # straight across the dome
+            rows.extend(zip(['p'] * n, ['t'] * n, np.full(n, p), tVap))
+            segments.append(('p', pLabel, start, len(rows)))
+        else:
+            add('p', pLabel, 'p', 't', np.full(n, p), np.linspace(lim['tmin'], lim['tmax'], n))
+    for tLabel in levels[units]['t']:
+        t = UC.convert(tLabel, 't', units, 'SI')
+        if t < lim['tc']:
+            psat = st.psat_t(t)
+            pLiq = np.geomspace(lim['pmax'], psat * 1.05, n // 2)
+            pVap = np.geomspace(psat / 1.05, lim['pmin'] * 1.5, n)
+            add('t', tLabel, 'p', 't', pLiq, np.full(len(pLiq), t))
+            start = segments.pop()[2]
+            rows.extend([('t', 'x', t, 0.0), ('t', 'x', t, 1.0)])
+            rows.extend(zip(['p'] * n, ['t'] * n, pVap, np.full(n, t)))
+            segments.append(('t', tLabel, start, len(rows)))
+        else:
+            add('t', tLabel, 'p', 't', np.geomspace(lim['pmax'], lim['pmin'] * 1.5, n), np.full(n, t))
+
+    prop1, prop2, val1, val2 = zip(*rows)
+    batch = setStates(np.array(prop1), np.array(prop2), np.array(val1, dtype=float), np.array(val2, dtype=float),
+                      steamTable=st)
+    UC.convertColumns(batch, 'SI', units)
+    found = {'dome': [], 'x': [], 'p': [], 't': []}
+    for kind, value, start, stop in segments:
+        found[kind].append((value, {q: getattr(batch, q)[start:stop] for q in ('p', 't', 'h', 's')}))
+    return chartLines(units, found['dome'][0][1], found['p'], found['t'], found['x'])
+
+class propertyChart:
+    """
+    One chart on a matplotlib Figure (T-s, P-h or h-s).  The background lines get drawn once per setLines/setKind,
+    after that showStates only repaints the state markers
+    """
+    def __init__(self, figure, kind='T-s'):
+        """
+        :param figure: matplotlib Figure, with a canvas attached (FigureCanvasQTAgg in the GUI, Agg works too)
+        :param kind: one of CHARTS
+        """
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.kind = kind
+        self.lines = None
+        self.states = []
+        self._background = None  # saved pixels of everything but the markers
+        self._markers = None
+        self._path = None
+        figure.canvas.mpl_connect('draw_event', self._saveBackground)
+        self.drawBackground()
+
+    def setLines(self, lines):
+        """new chartLines (e.g. after a unit change), None clears the chart until the next set arrive"""
+        self.lines = lines
+        if lines is None:
+            self.states = []
+        self.drawBackground()
+
+    def setKind(self, kind):
+        if kind not in CHARTS:
+            raise ValueError(f"Unknown chart {kind}, pick one of {', '.join(CHARTS)}")
+        self.kind = kind
+        self.drawBackground()
+
+    def drawBackground(self):
+        """full redraw: dome and isolines from the cached lines, then the markers"""
+        ax = self.ax
+        ax.clear()
+        xq, yq, logY = CHARTS[self.kind]
+        ax.set_title(f"{self.kind} diagram")
+        if self.lines is None:
+            ax.text(0.5, 0.5, "computing property lines...", ha='center', va='center', transform=ax.transAxes)
+            self._markers = self._path = None
+            self.figure.canvas.draw_idle()
+            return
+        units = self.lines.units
+        for value, line in self.lines.qualities:
+            ax.plot(line[xq], line[yq], color='0.75', lw=0.6)
+        for value, line in self.lines.isobars:
+            ax.plot(line[xq], line[yq], color='tab:blue', lw=0.7, alpha=0.6)
+            self._label(line, xq, yq, f"{value:g} {UC.units('p', units)}", 'tab:blue')
+        for value, line in self.lines.isotherms:
+            ax.plot(line[xq], line[yq], color='tab:red', lw=0.7, alpha=0.6)
+            self._label(line, xq, yq, f"{value:g} {UC.units('t', units)}", 'tab:red')
+        ax.plot(self.lines.dome[xq], self.lines.dome[yq], color='k', lw=1.4)
+        if logY:
+            ax.set_yscale('log')
+        ax.set_xlabel(f"{axisNames[xq]} ({UC.units(xq, units)})")
+        ax.set_ylabel(f"{axisNames[yq]} ({UC.units(yq, units)})")
+        # markers are animated so they stay out of the saved background and can be blitted on their own
+        self._path, = ax.plot([], [], color='tab:green', lw=1.0, ls='--', animated=True)
+        self._markers, = ax.plot([], [], 'o', color='tab:green', ms=7, animated=True)
+        self.figure.canvas.draw_idle()
+
+    def _label(self, line, xq, yq, text, color):
+        """small tag at the last good point of a line"""
+        ok = np.flatnonzero(np.isfinite(line[xq]) & np.isfinite(line[yq]))
+        if len(ok):
+            k = ok[-1]
+            self.ax.annotate(text, (line[xq][k], line[yq][k]), fontsize=6, color=color)
+
+    def _saveBackground(self, event):
+        """after a full draw: keep the pixels and put the markers back on top"""
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._drawMarkers()
+
+    def _drawMarkers(self):
+        if self._markers is None:
+            return
+        xq, yq = CHARTS[self.kind][:2]
+        xs = [getattr(st, xq) for st in self.states]
+        ys = [getattr(st, yq) for st in self.states]
+        self._markers.set_data(xs, ys)
+        self._path.set_data(xs, ys)
+        self.ax.draw_artist(self._path)
+        self.ax.draw_artist(self._markers)
+
+    def showStates(self, states):
+        """
+        Marks states on the chart, only the markers get repainted
+        :param states: list of thermoState (or stateRow), in the same units as the chart's lines
+        """
+        self.states = list(states)
+        canvas = self.figure.canvas
+        if self._background is None or self._markers is None:
+            canvas.draw_idle()  # the full draw will put them on
+            return
+        canvas.restore_region(self._background)
+        self._drawMarkers()
+        canvas.blit(self.figure.bbox)
@@ -0,0 +1,160 @@
+"""
+Simple Rankine cycle built out of stateBatch steps, so one cycle and a sweep over thousands of boiler conditions
+are the same code:
+    1 saturated liquid out of the condenser at pLow
+    2 pump to pHigh (isentropic efficiency etaPump)
+    3 boiler at pHigh to tHigh (or saturated vapor if tHigh is None)
+    4 turbine back down to pLow (isentropic efficiency etaTurbine), then the condenser takes it back to 1
+Everything runs through ThermoBatch.setStates, which only hits the library once per unique pressure for the
+saturation props and mixes the two-phase rows as arrays, so the condenser and turbine exit states of a whole sweep
+share one saturation lookup at pLow.
+
+    python RankineCycle.py  # prints an example cycle and times a 100 x 100 design map
+"""
+
+#region imports
+import sys
+import time
+import logging
+import numpy as np
+from SteamTables import steamTables
+from ThermoBatch import setStates
+from UnitConversion import UC
+#endregion
+
+#region cycle steps
+def pump(inlet, pOut, eta=1.0, steamTable=None):
+    """
+    Compresses the inlet states to pOut
+    :param inlet: stateBatch coming in
+    :param pOut: outlet pressure, scalar or one per row
+    :param eta: isentropic efficiency
+    :return: (outlet stateBatch, work in per unit mass)
+    """
+    pOut = np.broadcast_to(np.asarray(pOut, dtype=float), inlet.p.shape)
+    ideal = setStates('p', 's', pOut, inlet.s, steamTable=steamTable)
+    h = inlet.h + (ideal.h - inlet.h) / eta
+    out = setStates('p', 'h', pOut, h, steamTable=steamTable)
+    return out, out.h - inlet.h
+
+def boiler(inlet, tOut=None, steamTable=None):
+    """
+    Heats the inlet states at constant pressure
+    :param tOut: outlet temperature, scalar or one per row, None for saturated vapor
+    :return: (outlet stateBatch, heat in per unit mass)
+    """
+    if tOut is None:
+        out = setStates('p', 'x', inlet.p, np.ones(len(inlet)), steamTable=steamTable)
+    else:
+        out = setStates('p', 't', inlet.p, np.broadcast_to(np.asarray(tOut, dtype=float), inlet.p.shape),
+                        steamTable=steamTable)
+    return out, out.h - inlet.h
+
+def turbine(inlet, pOut, eta=1.0, steamTable=None):
+    """
+    Expands the inlet states down to pOut
+    :param eta: isentropic efficiency
+    :return: (outlet stateBatch, work out per unit mass)
+    """
+    pOut = np.broadcast_to(np.asarray(pOut, dtype=float), inlet.p.shape)
+    ideal = setStates('p', 's', pOut, inlet.s, steamTable=steamTable)
+    h = inlet.h - eta * (inlet.h - ideal.h)
+    out = setStates('p', 'h', pOut, h, steamTable=steamTable)
+    return out, inlet.h - out.h
+
+def condenser(inlet, steamTable=None):
+    """
+    Condenses the inlet states to saturated liquid at their pressure
+    :return: (outlet stateBatch, heat out per unit mass)
+    """
+    out = setStates('p', 'x', inlet.p, np.zeros(len(inlet)), steamTable=steamTable)
+    return out, inlet.h - out.h
+#endregion
+
+class cycleResult:
+    """states and energy flows of one or more Rankine cycles, the arrays all have the shape of the inputs"""
+    def __init__(self, states, wPump, qIn, wTurbine, qOut, shape, SI):
+        self.states = states  # {1: stateBatch, 2: ..., 3: ..., 4: ...}, flat
+        self.shape = shape
+        self.SI = SI
+        self.wPump = wPump.reshape(shape)
+        self.qIn = qIn.reshape(shape)
+        self.wTurbine = wTurbine.reshape(shape)
+        self.qOut = qOut.reshape(shape)
+        self.wNet = self.wTurbine - self.wPump
+        self.efficiency = self.wNet / self.qIn
+        self.backWorkRatio = self.wPump / self.wTurbine
+
+    def summary(self, i=0):
+        """text report for cycle i (flat index), same look as the GUI labels"""
+        units = 'SI' if self.SI else 'EN'
+        eUnits = UC.units('h', units)
+        lines = []
+        for n, batch in self.states.items():
+            st = batch[i]
+            lines.append("State {:d}: {:<11} p = {:9.3f} {:}, T = {:8.3f} {:}, h = {:9.3f} {:}, s = {:7.4f} {:}, x = {:6.3f}"
+                         .format(n, st.region, st.p, UC.units('p', units), st.t, UC.units('t', units), st.h, eUnits,
+                                 st.s, UC.units('s', units), st.x))
+        flat = lambda a: a.reshape(-1)[i]
+        lines.append("Pump work = {:0.3f} {:}".format(flat(self.wPump), eUnits))
+        lines.append("Turbine work = {:0.3f} {:}".format(flat(self.wTurbine), eUnits))
+        lines.append("Net work = {:0.3f} {:}".format(flat(self.wNet), eUnits))
+        lines.append("Heat added = {:0.3f} {:}".format(flat(self.qIn), eUnits))
+        lines.append("Heat rejected = {:0.3f} {:}".format(flat(self.qOut), eUnits))
+        lines.append("Thermal efficiency = {:0.2f} %".format(100 * flat(self.efficiency)))
+        return "\n".join(lines)
+
+def rankine(pHigh, pLow, tHigh=None, etaTurbine=1.0, etaPump=1.0, SI=True, fast=None):
+    """
+    Evaluates Rankine cycles, every argument can be a scalar or an array (they get broadcast together)
+    Args:
+        pHigh: boiler pressure
+        pLow: condenser pressure
+        tHigh: turbine inlet temperature, None for saturated vapor
+        etaTurbine, etaPump: isentropic efficiencies
+        SI: True for SI units (bar, C, kJ/kg), False for english (psi, F, btu/lb), the cycle itself runs in SI
+        fast: True to use the interpolated saturation table, see steamTables.sat
+    Returns:
+        cycleResult, in the units asked for
+    """
+    steamTable = steamTables.sat(True, fast)
+    units = 'SI' if SI else 'EN'
+    pHigh, pLow = UC.convert(pHigh, 'p', units, 'SI'), UC.convert(pLow, 'p', units, 'SI')
+    tHigh = None if tHigh is None else UC.convert(tHigh, 't', units, 'SI')
+    args = [pHigh, pLow, etaTurbine, etaPump] + ([] if tHigh is None else [tHigh])
+    shape = np.broadcast(*[np.asarray(a, dtype=float) for a in args]).shape
+    full = lambda a: np.broadcast_to(np.asarray(a, dtype=float), shape).reshape(-1)
+    pHigh, pLow, etaTurbine, etaPump = full(pHigh), full(pLow), full(etaTurbine), full(etaPump)
+    if np.any(pHigh <= pLow):
+        raise ValueError("Boiler pressure has to be above the condenser pressure")
+
+    s1 = setStates('p', 'x', pLow, np.zeros(len(pLow)), steamTable=steamTable)
+    s2, wPump = pump(s1, pHigh, etaPump, steamTable)
+    s3, qIn = boiler(s2, None if tHigh is None else full(tHigh), steamTable)
+    s4, wTurbine = turbine(s3, pLow, etaTurbine, steamTable)
+    qOut = s4.h - s1.h  # condenser takes it back to state 1
+    if not SI:
+        for batch in (s1, s2, s3, s4):
+            UC.convertColumns(batch, 'SI', 'EN')
+        wPump, qIn, wTurbine, qOut = (UC.convert(e, 'h', 'SI', 'EN') for e in (wPump, qIn, wTurbine, qOut))
+    return cycleResult({1: s1, 2: s2, 3: s3, 4: s4}, wPump, qIn, wTurbine, qOut, shape, SI)
+
+def sweep(pHigh, tHigh, pLow, etaTurbine=1.0, etaPump=1.0, SI=True, fast=None):
+    """
+    Design map over every combination of boiler pressure and turbine inlet temperature
+    :param pHigh: 1-D array of boiler pressures
+    :param tHigh: 1-D array of turbine inlet temperatures
+    :return: cycleResult with arrays shaped (len(pHigh), len(tHigh)), efficiency[i, j] goes with pHigh[i], tHigh[j]
+    """
+    P, T = np.meshgrid(np.asarray(pHigh, dtype=float), np.asarray(tHigh, dtype=float), indexing='ij')
+    return rankine(P, pLow, T, etaTurbine, etaPump, SI, fast)
+
+if __name__ == "__main__":
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+    print(rankine(80.0, 0.08, 480.0, etaTurbine=0.85, etaPump=0.85).summary())
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    start = time.perf_counter()
+    result = sweep(np.linspace(20.0, 200.0, n), np.linspace(400.0, 650.0, n), 0.08, etaTurbine=0.85, etaPump=0.85)
+    seconds = time.perf_counter() - start
+    print(f"\n{n} x {n} design map in {seconds:.2f} s, efficiency {np.nanmin(result.efficiency):.3f} to "
+          f"{np.nanmax(result.efficiency):.3f}")
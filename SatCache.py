@@ -0,0 +1,83 @@
+#region imports
+import threading
+from collections import OrderedDict
+#endregion
+
+class satCache():
+    """
+    Wraps a steam table and memoizes the one argument saturation functions (tsat_p, vL_p, hV_p, ...).
+    Anything that isn't a saturation function (v_pt, h_pt, ...) is passed straight through to the table,
+    so a satCache can be used anywhere an XSteam object is, for example:
+        st = satCache(steamTables.get(), maxSize=1024)
+        st.hL_p(1.0)  # evaluated by pyXSteam
+        st.hL_p(1.0)  # dict lookup
+    """
+    #region class attributes
+    satFunctions = ('tsat_p', 'psat_t', 'vL_p', 'vV_p', 'uL_p', 'uV_p', 'hL_p', 'hV_p', 'sL_p', 'sV_p',
+                    'vL_t', 'vV_t', 'uL_t', 'uV_t', 'hL_t', 'hV_t', 'sL_t', 'sV_t')
+    #endregion
+
+    def __init__(self, steamTable, maxSize=4096, quantum=None):
+        """
+        :param steamTable: the XSteam object to wrap
+        :param maxSize: max number of entries kept per function, least recently used ones get evicted
+        :param quantum: if given, inputs are rounded to a multiple of this before lookup (and evaluation)
+            so values that only differ by noise share an entry
+        """
+        self.steamTable = steamTable
+        self.maxSize = maxSize
+        self.quantum = quantum
+        self._lock = threading.Lock()
+        self._caches = {name: OrderedDict() for name in self.satFunctions}
+        self.hits = dict.fromkeys(self.satFunctions, 0)
+        self.misses = dict.fromkeys(self.satFunctions, 0)
+        for name in self.satFunctions:
+            setattr(self, name, self._wrap(name))
+
+    def _wrap(self, name):
+        """builds the memoized version of steamTable.<name>"""
+        f = getattr(self.steamTable, name)
+        cache = self._caches[name]
+
+        def cached(val):
+            if self.quantum:
+                val = round(val / self.quantum) * self.quantum
+            with self._lock:
+                result = cache.get(val)
+                if result is not None:
+                    cache.move_to_end(val)
+                    self.hits[name] += 1
+                    return result
+            result = f(val)  # evaluate outside the lock, worst case two threads both compute it
+            with self._lock:
+                self.misses[name] += 1
+                cache[val] = result
+                if len(cache) > self.maxSize:
+                    cache.popitem(last=False)  # drop the least recently used entry
+            return result
+        cached.__name__ = name
+        cached.__doc__ = f"memoized {name}"
+        return cached
+
+    def __getattr__(self, name):
+        # only gets here for things we didn't wrap, like v_pt or h_pt
+        return getattr(self.steamTable, name)
+
+    def stats(self):
+        """per function hits, misses and hit rate, only for functions that have been called"""
+        with self._lock:
+            out = {}
+            for name in self.satFunctions:
+                calls = self.hits[name] + self.misses[name]
+                if calls:
+                    out[name] = {'hits': self.hits[name], 'misses': self.misses[name],
+                                 'hitRate': self.hits[name] / calls, 'size': len(self._caches[name])}
+            return out
+
+    def clear(self):
+        """empties every cache and resets the counters"""
+        with self._lock:
+            for name in self.satFunctions:
+                self._caches[name].clear()
+                self.hits[name] = 0
+                self.misses[name] = 0
@@ -0,0 +1,164 @@
+#region imports
+import numpy as np
+#endregion
+
+class satTable():
+    """
+    Precomputed saturation dome for fast (approximate) saturation lookups.
+    Tsat, psat and the saturated liquid/vapor v, u, h and s are evaluated once with pyXSteam on a dense pressure grid
+    from the triple point to just under the critical point, then read back with monotone cubic (PCHIP) interpolation.
+    The grid is log spaced in p at low pressure and log spaced in (pc - p) near the critical point, where the
+    dome closes up and the properties change fastest.
+
+    Every lookup takes a scalar or a numpy array.  The methods have the same names as the XSteam ones, and anything
+    that isn't a saturation function is passed through to the wrapped table, so a satTable can stand in for XSteam:
+        st = satTable(steamTables.get())
+        st.hV_p(np.array([1.0, 5.0, 10.0]))
+
+    Error bounds (relative to pyXSteam, checked at the midpoint of every grid interval with checkErrorBounds and at
+    random pressures and temperatures, default grid, same in SI and english).  They hold for the _p lookups, the _t
+    ones (split at psat(t) instead of p) and props_px / props_tx, which mix the same fits:
+        p <= 0.999*pc:         tsat, psat < 1e-6, vL < 2e-5 (pyXSteam's own region 3 vL is noisy at ~3e-6),
+                               everything else < 5e-6
+        0.999*pc < p < pmax:   < 4e-4, the dome closes up in here and pyXSteam's region 3 iterations get noisy
+    Outside [pmin, pmax] (or [tmin, tmax]) the lookups return nan, same as pyXSteam does.
+    """
+    #region class attributes
+    props = ('vL', 'vV', 'uL', 'uV', 'hL', 'hV', 'sL', 'sV')
+    logProps = ('vV',)  # these span orders of magnitude so they get interpolated as logs
+    _pBreakRatio = 16.529 / 22.06395  # pyXSteam's region 1/3 switch over its critical pressure, same in any units
+    #endregion
+
+    def __init__(self, steamTable, nLow=1500, nCrit=600):
+        """
+        :param steamTable: the XSteam (or satCache) object to build the table from, sets the unit system
+        :param nLow: number of nodes log spaced in p from the triple point up to the critical region
+        :param nCrit: number of extra nodes log spaced in (pc - p) near the critical point
+        """
+        self.steamTable = steamTable
+        pc = steamTable.criticalPressure()
+        self.pmin = steamTable.triplePointPressure() * (1 + 1e-6)
+        self.pmax = pc * (1 - 1e-7)
+        pSplit = 0.7 * pc
+        pLow = np.geomspace(self.pmin, pSplit, nLow, endpoint=False)
+        pHigh = pc - np.geomspace(pc - pSplit, pc - self.pmax, nCrit)
+        # pyXSteam switches from region 1 to region 3 equations at 16.529 MPa and the saturated props jump a bit
+        # there (up to ~1e-4 in vV), so the table is split in two pieces that meet at the switch
+        pBreak = pc * self._pBreakRatio
+        pAll = np.concatenate((pLow, pHigh))
+        pA = np.append(pAll[pAll < pBreak], pBreak)
+        pB = np.insert(pAll[pAll > pBreak], 0, pBreak)
+        nodesA = self._evaluate(np.append(pA[:-1], pBreak * (1 - 1e-12)))  # just under the switch
+        nodesB = self._evaluate(np.insert(pB[1:], 0, pBreak * (1 + 1e-12)))  # just over it
+        self.pNodes = np.concatenate((pA, pB[1:]))
+        self.tNodes = np.concatenate((nodesA['t'], nodesB['t'][1:]))
+        self.tmin, self.tmax = self.tNodes[0], self.tNodes[-1]
+
+        from scipy.interpolate import PchipInterpolator  # imported here so importing this module stays cheap
+        lpA, lpB = np.log(pA), np.log(pB)
+        self._tsat = PchipInterpolator(np.log(self.pNodes), self.tNodes, extrapolate=False)
+        self._lpsat = PchipInterpolator(self.tNodes, np.log(self.pNodes), extrapolate=False)
+        self._byP = {}
+        self._byT = {}
+        for name in self.props:
+            yA, yB = nodesA[name], nodesB[name]
+            if name in self.logProps:
+                yA, yB = np.log(yA), np.log(yB)
+            self._byP[name] = self._joined(lpA, yA, lpB, yB)
+            self._byT[name] = self._joined(nodesA['t'], yA, nodesB['t'], yB)
+            setattr(self, name + '_p', self._lookup(self._byP[name], name in self.logProps, True))
+            setattr(self, name + '_t', self._lookup(self._byT[name], name in self.logProps, False))
+
+    @staticmethod
+    def _joined(xA, yA, xB, yB):
+        """one piecewise polynomial made of a PCHIP fit on each side of a shared break point xA[-1] == xB[0]"""
+        from scipy.interpolate import PchipInterpolator, PPoly
+        a = PchipInterpolator(xA, yA)
+        b = PchipInterpolator(xB, yB)
+        return PPoly(np.hstack((a.c, b.c)), np.concatenate((a.x, b.x[1:])), extrapolate=False)
+
+    def _evaluate(self, p):
+        """pyXSteam values of tsat and the saturated props at each pressure in p"""
+        st = self.steamTable
+        vals = {'t': np.array([st.tsat_p(pi) for pi in p])}
+        for name in self.props:
+            f = getattr(st, name + '_p')
+            vals[name] = np.array([f(pi) for pi in p])
+        return vals
+
+    @staticmethod
+    def _lookup(interp, isLog, byPressure):
+        def f(val):
+            val = np.asarray(val, dtype=float)
+            y = interp(np.log(val) if byPressure else val)
+            y = np.exp(y) if isLog else y
+            return y if y.ndim else float(y)
+        return f
+
+    def tsat_p(self, p):
+        """saturation temperature from pressure"""
+        t = self._tsat(np.log(np.asarray(p, dtype=float)))
+        return t if t.ndim else float(t)
+
+    def psat_t(self, t):
+        """saturation pressure from temperature"""
+        p = np.exp(self._lpsat(np.asarray(t, dtype=float)))
+        return p if p.ndim else float(p)
+
+    def props_px(self, p, x):
+        """
+        Two-phase properties from pressure and quality as array operations
+        :return: dict with t, v, u, h and s arrays
+        """
+        p = np.asarray(p, dtype=float)
+        x = np.asarray(x, dtype=float)
+        lp = np.log(p)
+        out = {'t': self._tsat(lp)}
+        sat = {name: interp(lp) for name, interp in self._byP.items()}
+        return self._mix(out, sat, x)
+
+    def props_tx(self, t, x):
+        """
+        Two-phase properties from temperature and quality as array operations
+        :return: dict with p, v, u, h and s arrays
+        """
+        t = np.asarray(t, dtype=float)
+        x = np.asarray(x, dtype=float)
+        out = {'p': np.exp(self._lpsat(t))}
+        sat = {name: interp(t) for name, interp in self._byT.items()}
+        return self._mix(out, sat, x)
+
+    def _mix(self, out, sat, x):
+        for name in self.logProps:
+            sat[name] = np.exp(sat[name])
+        for prop in ('v', 'u', 'h', 's'):
+            out[prop] = sat[prop + 'L'] + x * (sat[prop + 'V'] - sat[prop + 'L'])
+        return out
+
+    def __getattr__(self, name):
+        # only gets here for things we didn't build, like v_pt or h_pt
+        return getattr(self.steamTable, name)
+
+    def checkErrorBounds(self, pCut=None):
+        """
+        Compares the table against pyXSteam at the midpoint of every grid interval (the worst spot for interpolation)
+        :param pCut: pressure splitting the report into below/above, defaults to 0.999*pc
+        :return: dict of property -> (max relative error for p <= pCut, max relative error above pCut)
+        """
+        st = self.steamTable
+        pCut = 0.999 * st.criticalPressure() if pCut is None else pCut
+        pMid = np.sqrt(self.pNodes[:-1] * self.pNodes[1:])
+        tMid = 0.5 * (self.tNodes[:-1] + self.tNodes[1:])
+        low = pMid <= pCut
+        tLow = self.psat_t(tMid) <= pCut  # the _t lookups get split at the same pressure
+        checks = {'tsat_p': (self.tsat_p(pMid), [st.tsat_p(p) for p in pMid], low),
+                  'psat_t': (self.psat_t(tMid), [st.psat_t(t) for t in tMid], tLow)}
+        for name in self.props:
+            checks[name + '_p'] = (getattr(self, name + '_p')(pMid), [getattr(st, name + '_p')(p) for p in pMid], low)
+            checks[name + '_t'] = (getattr(self, name + '_t')(tMid), [getattr(st, name + '_t')(t) for t in tMid], tLow)
+        report = {}
+        for name, (approx, exact, below) in checks.items():
+            exact = np.asarray(exact)
+            rel = np.abs(approx - exact) / np.maximum(np.abs(exact), 1e-12)
+            report[name] = (rel[below].max(initial=0.0), rel[~below].max(initial=0.0))
+        return report
@@ -0,0 +1,170 @@
+"""
+Partial derivatives next to the states: cp, cv, (dv/dT)_p, (dv/dp)_T and (dh/dp)_T, for one state or a whole batch.
+They're finite differences of the single phase (p, T) functions, but set up so the work is shared:
+    - every state gets 2 points along T and 2 along p, all of them for all states go to the table in one batched
+      evaluation (whole arrays on the if97 backend, one call per unique point otherwise)
+    - each point gives h and v together, so the T pair makes cp and dv/dT, the p pair dh/dp and dv/dp,
+      and cv comes out of those without any evaluation of its own (cv = cp + T (dv/dT)^2 / (dv/dp))
+    - the state itself is the base point, its h and v get reused by the one sided stencils instead of evaluated again
+That's 4 evaluations for 5 derivatives, against 2 per derivative (plus cv's own) perturbing setState by hand.
+Steps depend on the region (see steps) and shrink or go one sided so the points never cross the saturation line
+or leave the range of the tables.  Two-phase states get nan, p and T aren't independent in there.
+
+    d = state.derivatives()  # dict of floats in the state's units
+    d = batch.derivatives()  # dict of arrays, one per row of a stateBatch
+    print(StateDerivatives.report())  # evaluations per derivative so far
+"""
+
+#region imports
+import numpy as np
+from SteamTables import steamTables
+from SatTable import satTable
+from IF97 import if97Table
+import StateSolvers
+import ThermoTrace
+from StateRegions import REGIONS, REGION_SUBCOOLED, REGION_SUPERHEATED, REGION_SUPERCRITICAL
+from UnitConversion import UC
+#endregion
+
+names = ('cp', 'cv', 'dvdT', 'dvdp', 'dhdp')
+
+# region code -> (T step in C, p step relative to p).  Liquid gets the bigger p step since v barely moves with p
+# there and a small step would be all round off, near the critical point everything moves fast so smaller ones
+steps = {REGION_SUBCOOLED: (1e-2, 1e-3), REGION_SUPERHEATED: (1e-2, 1e-4), REGION_SUPERCRITICAL: (1e-3, 1e-4)}
+
+# numerator and denominator quantity per derivative for the unit conversion, cp and cv are in entropy units
+_quantities = {'cp': ('s', None), 'cv': ('s', None), 'dvdT': ('v', 'dt'), 'dvdp': ('v', 'p'), 'dhdp': ('h', 'p')}
+
+#region stats
+stats = {'states': 0, 'evaluations': 0, 'derivatives': 0}
+
+def resetStats():
+    """clears the evaluation counters"""
+    for key in stats:
+        stats[key] = 0
+
+def report():
+    """one line summary of what the derivatives cost so far"""
+    st = stats
+    per = st['evaluations'] / st['derivatives'] if st['derivatives'] else 0.0
+    return (f"{st['states']} states: {st['derivatives']} derivatives from {st['evaluations']} evaluations, "
+            f"{per:.2f} evaluations per derivative")
+#endregion
+
+def _stencil(x, h, lo, hi):
+    """
+    Offsets and weights per row for a first derivative along one axis, second order either way:
+    central (x-h, x+h) when both fit in [lo, hi], otherwise one sided into whichever side has more room,
+    with h cut down to fit.  Rows with no room at all get nan weights
+    :return: (off1, off2, w0, w1, w2) arrays, derivative = w0 f(x) + w1 f(x+off1) + w2 f(x+off2)
+    """
+    room = np.minimum(x - lo, hi - x)
+    central = room >= h
+    up = hi - x >= x - lo  # the side one sided stencils go to
+    hOne = np.minimum(h, np.maximum(hi - x, x - lo) / 2)
+    sign = np.where(up, 1.0, -1.0)
+    hs = np.where(central, h, hOne * sign)  # signed step
+    off1 = np.where(central, -h, hs)
+    off2 = np.where(central, h, 2 * hs)
+    w0 = np.where(central, 0.0, -1.5 / hs)
+    w1 = np.where(central, -0.5 / h, 2.0 / hs)
+    w2 = np.where(central, 0.5 / h, -0.5 / hs)
+    bad = ~(hOne > 0) & ~central
+    for w in (w0, w1, w2):
+        w[bad] = np.nan
+    return off1, off2, w0, w1, w2
+
+def derivatives(p, t, region, h=None, v=None, SI=True, steamTable=None, fast=None, backend=None):
+    """
+    cp, cv, (dv/dT)_p, (dv/dp)_T and (dh/dp)_T at many (p, T) states at once, see the module docstring
+    :param p, t: arrays (or scalars) of the states' pressure and temperature
+    :param region: region code per state (see StateRegions.REGIONS) or names, two-phase and unknown rows get nan
+    :param h, v: the states' own h and v, used as base points by the one sided stencils (evaluated if not given)
+    :param SI: False if p, t, h and v are english, the derivatives come back english too
+    :param steamTable: SI XSteam-like object, defaults to steamTables.sat(True, fast, backend)
+    :return: dict of name -> array (float for scalar input) in kJ/kg*K, m^3/kg*C, m^3/kg*bar and kJ/kg*bar for SI,
+        btu/lb*F, ft^3/lb*F, ft^3/lb*psi and btu/lb*psi for english
+    """
+    from ThermoBatch import stateBatch, _singlePhase  # ThermoBatch imports ThermoCore, which hands out to here
+    scalar = np.ndim(p) == 0
+    p = np.atleast_1d(np.asarray(p, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+    region = np.atleast_1d(np.asarray(region))
+    if region.dtype.kind in 'US':
+        region = np.array([REGIONS.index(name) for name in region], dtype=np.int8)
+    region = np.broadcast_to(region, p.shape)
+    if not SI:
+        p, t = UC.convert(p, 'p', 'EN', 'SI'), UC.convert(t, 't', 'EN', 'SI')
+    st = steamTables.sat(True, fast, backend) if steamTable is None else steamTable
+    lim = StateSolvers.limits(st)
+    n = len(p)
+    out = {name: np.full(n, np.nan) for name in names}
+    rows = np.flatnonzero(np.isin(region, list(steps)))
+
+    if len(rows):
+        P, T, codes = p[rows], t[rows], region[rows]
+        dT = np.array([steps[c][0] for c in codes])
+        dp = np.array([steps[c][1] for c in codes]) * P
+        # T range: up to just under tsat for liquid, down to just over it for vapor, same edges solve_p uses
+        below = P < lim['pc']
+        tLo, tHi = np.full(len(P), lim['tmin']), np.full(len(P), lim['tmax'])
+        liquid, vapor = below & (codes == REGION_SUBCOOLED), below & (codes == REGION_SUPERHEATED)
+        tHi[liquid] = _sat(st, 'tsat_p', np.maximum(P[liquid] - lim['pBand'], lim['pmin']))
+        tLo[vapor] = _sat(st, 'tsat_p', np.minimum(P[vapor] + lim['pBand'], lim['pc']))
+        # p range: psat at T plus or minus the region 4 band
+        cold = T < lim['tc']
+        pLo, pHi = np.full(len(P), lim['pmin']), np.full(len(P), lim['pmax'])
+        liquid, vapor = cold & (codes == REGION_SUBCOOLED), vapor & cold  # liquid over pc can still drop under it
+        pLo[liquid] = _sat(st, 'psat_t', T[liquid]) + lim['pBand']
+        pHi[vapor] = _sat(st, 'psat_t', T[vapor]) - lim['pBand']
+        stT, stP = _stencil(T, dT, tLo, tHi), _stencil(P, dp, pLo, pHi)
+
+        # base points only matter for the one sided rows, the state's own h and v if we have them
+        m = len(P)
+        oneSided = (stT[2] != 0) | (stP[2] != 0)
+        given = h is not None and v is not None
+        base = np.flatnonzero(oneSided) if not given else np.zeros(0, dtype=int)
+
+        # all the points for all the states, one batched evaluation with repeats dropped
+        evP = np.concatenate((P, P, P + stP[0], P + stP[1], P[base]))
+        evT = np.concatenate((T + stT[0], T + stT[1], T, T, T[base]))
+        ok = np.isfinite(evP) & np.isfinite(evT)
+        pts, inv = np.unique(np.column_stack((evP[ok], evT[ok])), axis=0, return_inverse=True)
+        evals = stateBatch(len(pts))
+        _singlePhase(st, evals, np.arange(len(pts)), pts[:, 0], pts[:, 1], np.zeros(len(pts), dtype=np.int8),
+                     ('h', 'v'))
+        stats['evaluations'] += len(pts)
+        vals, f0 = {}, {}
+        for q, mine in (('h', h), ('v', v)):
+            col = np.full(len(evP), np.nan)
+            col[ok] = getattr(evals, q)[inv.reshape(-1)]
+            vals[q] = col[:4 * m].reshape(4, m)
+            if given:
+                f0[q] = np.broadcast_to(np.atleast_1d(np.asarray(mine, dtype=float)), p.shape)[rows]
+                if not SI:
+                    f0[q] = UC.convert(f0[q], q, 'EN', 'SI')
+            else:
+                f0[q] = np.zeros(m)
+                f0[q][base] = col[4 * m:]
+
+        d = lambda q, w, i: np.where(w[2] == 0, 0.0, w[2] * f0[q]) + w[3] * vals[q][i] + w[4] * vals[q][i + 1]
+        cp, dvdT = d('h', stT, 0), d('v', stT, 0)
+        dhdp, dvdp = d('h', stP, 2), d('v', stP, 2)
+        cv = cp + 100.0 * (T + 273.15) * dvdT ** 2 / dvdp  # bar -> kPa so T dv/dT^2 / dv/dp comes out in kJ/kg*K
+        for name, val in zip(names, (cp, cv, dvdT, dvdp, dhdp)):
+            out[name][rows] = val
+        stats['derivatives'] += len(names) * m
+    stats['states'] += n
+
+    if not SI:
+        for name, (num, den) in _quantities.items():
+            scale = UC.factor(num, 'SI', 'EN')[0] / (UC.factor(den, 'SI', 'EN')[0] if den else 1.0)
+            out[name] *= scale
+    return {name: float(a[0]) for name, a in out.items()} if scalar else out
+
+def _sat(steamTable, name, x):
+    """saturation function over an array, in one call if the table takes arrays"""
+    f = getattr(steamTable, name)
+    if isinstance(ThermoTrace.unwrap(steamTable), (satTable, if97Table)):
+        return np.asarray(f(x), dtype=float)
+    return np.array([f(xi) for xi in x], dtype=float)
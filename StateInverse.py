@@ -0,0 +1,277 @@
+"""
+Inversion for the property pairs without p or T in them: (h, s) for turbine states and (u, v) for closed vessels.
+The (p, T) plane is covered by four structured grids ("sheets"): compressed liquid and superheated vapor below the
+critical pressure (their T range stops right at the saturation line), supercritical above it, and a (p, x) sheet
+for the dome itself.  Every grid cell is split into two triangles and mapped forward into the h-s and u-v planes
+(u-v uses log v, since v covers five orders of magnitude).  A bucket grid over each plane lists the triangles
+overlapping every bucket, so finding the triangle around an input pair is one bucket lookup plus a barycentric
+test against the few candidates in that bucket, done for whole arrays at once.
+The barycentric weights interpolate (log p, T) or (log p, x) inside the triangle, and newton() polishes that
+against pyXSteam if full accuracy is needed.
+"""
+
+#region imports
+import numpy as np
+from SteamTables import steamTables
+import StateSolvers
+import ThermoTrace
+#endregion
+
+class stateInverter():
+    """
+    Precomputed triangle index for one plane ('hs' or 'uv') in one unit system, for example:
+        inv = stateInverter.get('hs', SI=True)
+        p, t, x = inv.invert(h, s)  # arrays in, arrays out, nan where the pair is outside the grid
+    """
+    #region class attributes
+    planes = {'hs': ('h', 's'), 'uv': ('u', 'v')}
+    _shared = {}  # (plane, kind of table, its critical pressure so one per unit system) -> stateInverter
+    #endregion
+
+    def __init__(self, steamTable, plane='hs', nP=90, nT=60, nX=30, nBuckets=160):
+        """
+        :param steamTable: the XSteam object the grid is built from, sets the unit system
+        :param plane: 'hs' or 'uv'
+        :param nP: grid points in p for each sheet (log spaced)
+        :param nT: grid points in T across each single phase sheet
+        :param nX: grid points in quality across the two-phase sheet
+        :param nBuckets: buckets along each axis of the lookup grid (at most, edges are coordinate quantiles)
+        """
+        self.steamTable = steamTable
+        self.plane = plane
+        self.props = self.planes[plane]
+        st = steamTable
+        lim = StateSolvers.limits(st)
+        band = lim['pBand']
+        pSub = np.geomspace(lim['pmin'] + 2 * band, lim['pc'] - 2 * band, nP)
+        pSup = np.geomspace(lim['pc'], lim['pmax'], nP // 2)
+        tau = np.linspace(0.0, 1.0, nT)
+
+        sheets = []  # each one is (p, t, x) node arrays of shape (rows, cols)
+        # stop pBand short of the saturation line on each side, same as the StateSolvers brackets
+        tLiqTop = np.array([st.tsat_p(p - band) for p in pSub])
+        tVapBot = np.array([st.tsat_p(p + band) for p in pSub])
+        sheets.append((np.repeat(pSub[:, None], nT, 1), lim['tmin'] + tau * (tLiqTop - lim['tmin'])[:, None],
+                       np.full((nP, nT), -1.0)))
+        sheets.append((np.repeat(pSub[:, None], nT, 1), tVapBot[:, None] + tau * (lim['tmax'] - tVapBot)[:, None],
+                       np.full((nP, nT), -1.0)))
+        sheets.append((np.repeat(pSup[:, None], nT, 1), np.repeat((lim['tmin'] + tau * (lim['tmax'] - lim['tmin']))[None, :],
+                       len(pSup), 0), np.full((len(pSup), nT), -1.0)))
+        xs = np.linspace(0.0, 1.0, nX)
+        tSat = np.array([st.tsat_p(p) for p in pSub])
+        sheets.append((np.repeat(pSub[:, None], nX, 1), np.repeat(tSat[:, None], nX, 1), np.repeat(xs[None, :], nP, 0)))
+
+        # nodes: parameters (log p, T or x) and forward coordinates in the plane
+        params, coords, twoPhase, tris = [], [], [], []
+        offset = 0
+        for P, T, X in sheets:
+            rows, cols = P.shape
+            Y = np.array([self._forward(p, t, x) for p, t, x in zip(P.ravel(), T.ravel(), X.ravel())])
+            tp = X.ravel() >= 0
+            params.append(np.column_stack((np.log(P.ravel()), np.where(tp, X.ravel(), T.ravel()))))
+            coords.append(Y)
+            twoPhase.append(tp)
+            ij = np.arange(rows * cols).reshape(rows, cols) + offset
+            a, b, c, d = ij[:-1, :-1].ravel(), ij[:-1, 1:].ravel(), ij[1:, :-1].ravel(), ij[1:, 1:].ravel()
+            tris.append(np.column_stack((a, b, d)))
+            tris.append(np.column_stack((a, d, c)))
+            offset += rows * cols
+        self._params = np.concatenate(params)
+        self._twoPhase = np.concatenate(twoPhase)
+        coords = np.concatenate(coords)
+        tris = np.concatenate(tris)
+        tris = tris[np.isfinite(coords[tris]).all(axis=(1, 2))]  # pyXSteam gave nan somewhere on these, skip them
+
+        # normalize the plane to the unit square so the barycentric tests are well conditioned
+        self._lo = np.nanmin(coords, axis=0)
+        self._span = np.nanmax(coords, axis=0) - self._lo
+        self._coords = (coords - self._lo) / self._span
+        self._tris = tris
+        self.nBuckets = nBuckets
+        self._buildBuckets()
+
+    def _forward(self, p, t, x):
+        """plane coordinates of one node"""
+        st = self.steamTable
+        a, b = self.props
+        if x >= 0:
+            vals = [getattr(st, n + 'L_p')(p) + x * (getattr(st, n + 'V_p')(p) - getattr(st, n + 'L_p')(p)) for n in (a, b)]
+        else:
+            vals = [getattr(st, a + '_pt')(p, t), getattr(st, b + '_pt')(p, t)]
+        if b == 'v':
+            vals[1] = np.log(vals[1])
+        return vals
+
+    def _buildBuckets(self):
+        """
+        Lists the triangles overlapping every bucket (CSR style, _bucketStart/_bucketTris) on a bucket grid whose edges sit at
+        quantiles of the node coordinates, so the crowded parts of the plane (the compressed liquid, where p hardly
+        moves h, s or u, v) get more, smaller buckets
+        """
+        n = self.nBuckets
+        q = np.linspace(0.0, 1.0, n + 1)[1:-1]
+        finite = self._coords[np.isfinite(self._coords).all(axis=1)]
+        self._edges = [np.unique(np.quantile(finite[:, k], q)) for k in (0, 1)]
+        self._nb = (len(self._edges[0]) + 1, len(self._edges[1]) + 1)
+        tri = self._coords[self._tris]  # (nTri, 3, 2)
+        lo = [np.searchsorted(self._edges[k], tri[:, :, k].min(axis=1), side='right') for k in (0, 1)]
+        hi = [np.searchsorted(self._edges[k], tri[:, :, k].max(axis=1), side='right') for k in (0, 1)]
+        ids, cells = [], []
+        for k in range(len(tri)):
+            ii, jj = np.meshgrid(np.arange(lo[0][k], hi[0][k] + 1), np.arange(lo[1][k], hi[1][k] + 1), indexing='ij')
+            cells.append((ii * self._nb[1] + jj).ravel())
+            ids.append(np.full(cells[-1].size, k))
+        cells = np.concatenate(cells)
+        ids = np.concatenate(ids)
+        order = np.argsort(cells, kind='stable')
+        self._bucketTris = ids[order]
+        self._bucketStart = np.searchsorted(cells[order], np.arange(self._nb[0] * self._nb[1] + 1))
+
+    @classmethod
+    def get(cls, plane='hs', SI=True, steamTable=None):
+        """
+        Shared inverter for a plane and unit system, built the first time (takes a couple of seconds)
+        :param plane: 'hs' or 'uv'
+        :param SI: unit system, only used if steamTable isn't given
+        :param steamTable: table to build from, its type and unit system pick the shared inverter
+        """
+        steamTable = steamTables.get(SI) if steamTable is None else steamTable
+        key = (plane, type(ThermoTrace.unwrap(steamTable)).__name__, steamTable.criticalPressure())  # if97: no region 3
+        inv = cls._shared.get(key)
+        if inv is None:
+            inv = cls._shared[key] = cls(steamTable, plane)
+        return inv
+
+    def locate(self, a, b):
+        """
+        Finds the triangle around each point and its barycentric weights
+        :param a, b: arrays of the two plane properties (h and s, or u and v)
+        :return: (triangle index or -1, weights of shape (n, 3))
+        """
+        a = np.atleast_1d(np.asarray(a, dtype=float))
+        b = np.atleast_1d(np.asarray(b, dtype=float))
+        if self.props[1] == 'v':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                b = np.log(b)
+        q = (np.column_stack((a, b)) - self._lo) / self._span
+        N = len(q)
+        triIdx = np.full(N, -1, dtype=np.int64)
+        w = np.full((N, 3), np.nan)
+        inside = np.all((q >= 0) & (q <= 1), axis=1)
+        bucket = (np.searchsorted(self._edges[0], q[:, 0], side='right') * self._nb[1]
+                  + np.searchsorted(self._edges[1], q[:, 1], side='right'))
+        start = self._bucketStart[bucket]
+        count = self._bucketStart[bucket + 1] - start
+        todo = np.flatnonzero(inside & (count > 0))
+        k = 0
+        # walk the candidate lists one slot at a time, every pass only looks at the points still unresolved
+        while todo.size:
+            todo = todo[count[todo] > k]
+            if not todo.size:
+                break
+            cand = self._bucketTris[start[todo] + k]
+            tri = self._coords[self._tris[cand]]  # (n, 3, 2)
+            e1, e2, r = tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0], q[todo] - tri[:, 0]
+            det = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                l1 = (r[:, 0] * e2[:, 1] - r[:, 1] * e2[:, 0]) / det
+                l2 = (e1[:, 0] * r[:, 1] - e1[:, 1] * r[:, 0]) / det
+            l0 = 1.0 - l1 - l2
+            hit = (l0 >= -1e-9) & (l1 >= -1e-9) & (l2 >= -1e-9)
+            triIdx[todo[hit]] = cand[hit]
+            w[todo[hit]] = np.column_stack((l0[hit], l1[hit], l2[hit]))
+            todo = todo[~hit]
+            k += 1
+        return triIdx, w
+
+    def invert(self, a, b):
+        """
+        Interpolated state for each (h, s) or (u, v) pair
+        :return: arrays p, t, x (x is -1 for single phase, everything is nan where the pair is outside the grid)
+        """
+        triIdx, w = self.locate(a, b)
+        ok = triIdx >= 0
+        nodes = self._tris[np.maximum(triIdx, 0)]  # (N, 3)
+        par = np.einsum('nk,nkj->nj', w, self._params[nodes])
+        twoPhase = self._twoPhase[nodes].all(axis=1)
+        p = np.where(ok, np.exp(par[:, 0]), np.nan)
+        x = np.where(ok & twoPhase, np.clip(par[:, 1], 0.0, 1.0), -1.0)
+        t = np.full(len(p), np.nan)
+        st = self.steamTable
+        t[ok & ~twoPhase] = par[ok & ~twoPhase, 1]
+        t[ok & twoPhase] = [st.tsat_p(pi) for pi in p[ok & twoPhase]]
+        x[~ok] = np.nan
+        return p, t, x
+
+    def newton(self, a, b, p, t, x, iterations=20, tol=1e-11):
+        """
+        Polishes one interpolated state against pyXSteam with a damped finite difference newton solve
+        :param a, b: the target plane values (h and s, or u and v)
+        :param p, t, x: starting state from invert()
+        :return: refined p, t, x
+        """
+        st = self.steamTable
+        lim = StateSolvers.limits(st)
+        target = np.array([a, np.log(b) if self.props[1] == 'v' else b])
+        scale = self._span
+        twoPhase = x >= 0
+        if twoPhase:
+            zLo, zHi = np.array([np.log(lim['pmin']), 0.0]), np.array([np.log(lim['pc']), 1.0])
+        else:
+            zLo, zHi = np.array([np.log(lim['pmin']), lim['tmin']]), np.array([np.log(lim['pmax']), lim['tmax']])
+        resid = lambda z: (np.array(self._forward(np.exp(z[0]), z[1], z[1] if twoPhase else -1.0)) - target) / scale
+        z = np.array([np.log(p), x if twoPhase else t])
+        f0 = resid(z)
+        for _ in range(iterations):
+            if not np.all(np.isfinite(f0)) or np.max(np.abs(f0)) < tol:
+                break
+            J = np.empty((2, 2))
+            for k, dz in enumerate((1e-6, 1e-6 if twoPhase else 1e-5 * max(abs(z[1]), 1.0))):
+                zk = z.copy()
+                zk[k] += dz
+                J[:, k] = (resid(zk) - f0) / dz
+            try:
+                step = np.linalg.solve(J, -f0)
+            except np.linalg.LinAlgError:
+                break
+            # halve the step until the residual goes down, the liquid corner of h-s is badly conditioned in p
+            lam = 1.0
+            while lam > 1e-4:
+                zNew = np.clip(z + lam * step, zLo, zHi)
+                fNew = resid(zNew)
+                if np.all(np.isfinite(fNew)) and np.linalg.norm(fNew) < np.linalg.norm(f0):
+                    break
+                lam *= 0.5
+            else:
+                break
+            z, f0 = zNew, fNew
+        p = float(np.exp(z[0]))
+        if twoPhase:
+            return p, st.tsat_p(p), float(z[1])
+        return p, float(z[1]), -1.0
+
+def solveState(steamTable, prop1, val1, prop2, val2, refine=True):
+    """
+    State from (h, s) or (u, v), in either order
+    Args:
+        steamTable: XSteam-like object to evaluate with, its unit system picks the shared inverter
+        prop1, val1, prop2, val2: the pair and its values
+        refine: True to newton polish the interpolated (p, T) against pyXSteam. In region 3 (above ~165 bar and
+            350 C) pyXSteam's own h_pt/s_pt are only good to ~1e-6, which caps how far the polish can go
+    Returns:
+        dict with p, t, v, u, h, s, x and region, same as StateSolvers.solveState
+    """
+    if (prop2, prop1) in (('h', 's'), ('u', 'v')):
+        prop1, prop2, val1, val2 = prop2, prop1, val2, val1
+    plane = prop1 + prop2
+    if plane not in stateInverter.planes:
+        raise ValueError(f"Unsupported property combination: {prop1} and {prop2}")
+    inv = stateInverter.get(plane, steamTable=steamTable)
+    p, t, x = (float(arr[0]) for arr in inv.invert(val1, val2))
+    if np.isnan(p):
+        raise ValueError(f"{prop1} = {val1} and {prop2} = {val2} is outside the range of the steam tables")
+    if refine:
+        p, t, x = inv.newton(val1, val2, p, t, x)
+    if x >= 0:
+        return StateSolvers.twoPhase_p(steamTable, p, x)
+    return StateSolvers.singlePhase(steamTable, p, t)
@@ -0,0 +1,144 @@
+"""
+Region classifier for (p, T) points: subcooled, two-phase, superheated or supercritical, whole arrays in one pass.
+The saturation curve gets tabulated once (exact tsat at a few thousand log spaced pressures).  tsat goes up with p,
+so the two nodes around a point bracket its tsat, and anything colder than the lower node minus the tolerance or
+hotter than the upper node plus it is decided right there.  Only the few points inside that thin band get an exact
+tsat from the table, once per unique pressure.
+Above the critical pressure there's no dome: T at or over tc is supercritical, under it compressed liquid (subcooled).
+
+    regions = regionClassifier.get()
+    codes = regions.classify(p, t)  # int8 codes, REGIONS[code] is the name thermoState uses
+    for code, idx in regions.partition(codes).items():
+        ...  # evaluate each region's rows its own way
+"""
+
+#region imports
+import numpy as np
+from SteamTables import steamTables
+from SatTable import satTable
+from IF97 import if97Table
+import StateSolvers
+import ThermoTrace
+from UnitConversion import UC
+#endregion
+
+#region region codes
+# small int codes for the region column, index into REGIONS to get the name thermoState uses
+REGION_UNKNOWN = 0
+REGION_SUBCOOLED = 1
+REGION_SUPERHEATED = 2
+REGION_TWOPHASE = 3
+REGION_SUPERCRITICAL = 4
+REGIONS = ("unknown", "subcooled", "superheated", "two-phase", "supercritical")
+#endregion
+
+class regionClassifier:
+    """
+    Cached saturation curve of one (SI) table plus the two-phase tolerance, see the module docstring
+    """
+    #region class attributes
+    twoPhaseTol = 0.1  # C, |T - tsat| under this counts as two-phase, what setState has always used
+    _shared = {}  # (kind of table, its critical pressure, tolerance in C) -> regionClassifier
+    _last = (None, None, None)  # (table, tolerance, classifier) of the last get, setState asks every call
+    #endregion
+
+    def __init__(self, steamTable, tol=None, units='SI', nPoints=4096):
+        """
+        :param steamTable: SI XSteam-like object, the bracket curve and the exact lookups come from it
+        :param tol: two-phase tolerance as a temperature difference, defaults to twoPhaseTol
+        :param units: 'SI' or 'EN', the units tol is given in (C or F)
+        :param nPoints: saturation curve nodes, more nodes means a thinner band needing exact lookups
+        """
+        self.steamTable = steamTable
+        self.tol = self.twoPhaseTol if tol is None else UC.convert(tol, 'dt', units, 'SI')
+        lim = StateSolvers.limits(steamTable)
+        self.pc, self.tc = lim['pc'], lim['tc']
+        p = np.geomspace(lim['pmin'] * (1 + 1e-6), lim['pc'] * (1 - 1e-9), nPoints)  # pyXSteam balks right at the ends
+        t = np.asarray(steamTable.tsat_p(p) if isinstance(ThermoTrace.unwrap(steamTable), if97Table)
+                       else [steamTable.tsat_p(pi) for pi in p], dtype=float)
+        ok = np.isfinite(t)
+        self._p, self._t = p[ok], t[ok]
+        self.exactLookups = 0  # tsat_p calls made for points inside the band, for checking the bracket pays off
+
+    @classmethod
+    def get(cls, steamTable=None, tol=None, units='SI'):
+        """
+        Shared classifier for a table and tolerance, built the first time (a few thousand tsat calls)
+        :param steamTable: SI table, defaults to steamTables.sat()
+        :param tol: two-phase tolerance in units, defaults to twoPhaseTol
+        """
+        steamTable = steamTables.sat() if steamTable is None else steamTable
+        tol = cls.twoPhaseTol if tol is None else UC.convert(tol, 'dt', units, 'SI')
+        last = cls._last
+        if last[0] is steamTable and last[1] == tol:
+            return last[2]
+        key = (type(ThermoTrace.unwrap(steamTable)).__name__, steamTable.criticalPressure(), tol)  # each kind of table apart
+        regions = cls._shared.get(key)
+        if regions is None:
+            regions = cls._shared[key] = cls(steamTable, tol)
+        cls._last = (steamTable, tol, regions)
+        return regions
+
+    def _pick(self, t, tsat, tol):
+        """codes from exact tsat, same tests setState does (nan tsat, under the triple point, ends up subcooled)"""
+        return np.where(np.abs(t - tsat) < tol, REGION_TWOPHASE,
+                        np.where(t > tsat, REGION_SUPERHEATED, REGION_SUBCOOLED)).astype(np.int8)
+
+    def classify(self, p, t, SI=True, tol=None):
+        """
+        Region of every (p, T) point
+        :param p, t: arrays (or scalars) of pressure and temperature
+        :param SI: False if p and t (and tol) are in english units
+        :param tol: tolerance for this call only, 0 to just split liquid from vapor (no two-phase at all)
+        :return: int8 array of region codes, see REGIONS
+        """
+        p = np.atleast_1d(np.asarray(p, dtype=float))
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        if not SI:
+            p, t = UC.convert(p, 'p', 'EN', 'SI'), UC.convert(t, 't', 'EN', 'SI')
+        tol = self.tol if tol is None else UC.convert(tol, 'dt', 'SI' if SI else 'EN', 'SI')
+        codes = np.full(p.shape, REGION_UNKNOWN, dtype=np.int8)
+
+        above = p >= self.pc
+        codes[above] = np.where(t[above] >= self.tc, REGION_SUPERCRITICAL, REGION_SUBCOOLED)
+        below = ~above
+        inCurve = below & (p >= self._p[0]) & (p <= self._p[-1])
+        k = np.clip(np.searchsorted(self._p, p[inCurve], side='right') - 1, 0, len(self._p) - 2)
+        tIn = t[inCurve]
+        pick = np.where(tIn < self._t[k] - tol, REGION_SUBCOOLED,
+                        np.where(tIn > self._t[k + 1] + tol, REGION_SUPERHEATED, REGION_UNKNOWN))
+        codes[inCurve] = pick
+
+        # the thin band around the curve and anything off the ends of it get the exact tsat
+        band = np.flatnonzero(below & (codes == REGION_UNKNOWN))
+        if len(band):
+            pu, inv = np.unique(p[band], return_inverse=True)
+            arrays = isinstance(ThermoTrace.unwrap(self.steamTable), (satTable, if97Table))
+            tsat = np.asarray(self.steamTable.tsat_p(pu) if arrays else [self.steamTable.tsat_p(pi) for pi in pu],
+                              dtype=float)
+            self.exactLookups += len(pu)
+            codes[band] = self._pick(t[band], tsat.reshape(-1)[inv.reshape(-1)], tol)
+        return codes
+
+    def regionOf(self, p, t, tol=None):
+        """
+        Region name of one SI point, one exact tsat lookup (the table's cache makes repeats cheap)
+        :param tol: same as classify
+        """
+        if p >= self.pc:
+            return "supercritical" if t >= self.tc else "subcooled"
+        tsat = self.steamTable.tsat_p(p)
+        if abs(t - tsat) < (self.tol if tol is None else tol):
+            return "two-phase"
+        return "superheated" if t > tsat else "subcooled"
+
+    @staticmethod
+    def partition(codes):
+        """
+        Row indices per region, so bulk jobs can send each group down its own path
+        :param codes: array from classify
+        :return: dict of region code -> index array, only the regions that show up
+        """
+        order = np.argsort(codes, kind='stable')
+        found, starts = np.unique(codes[order], return_index=True)
+        return {int(c): idx for c, idx in zip(found, np.split(order, starts[1:]))}
@@ -0,0 +1,249 @@
+"""
+Solvers for the property pairs that pyXSteam can't evaluate directly.
+Every pair has p or T in it, so the state comes down to one unknown (T for the p pairs, p for the T pairs):
+first the saturated values at the given p or T decide if the state is two-phase (then it's just a quality),
+otherwise the unknown gets a bracketed brentq solve on the liquid or vapor side of the dome.
+The bracket starts out tight around a guess (pyXSteam's backward equations for p-h and p-s, otherwise the last
+root found for the same pair and side) and only falls back to the full range if the guess doesn't bracket the root.
+At a fixed T, h of hot compressed liquid (and s of liquid under 4 C) isn't monotone in p, so when the ends of a
+side don't bracket the value the side gets split at the turning point and the part nearer the dome is searched.
+The other way round, a T-h/T-u/T-s value inside the dome could also be a compressed liquid; it's read as two-phase
+and the state dict gets ambiguous=True (thermoState.ambiguous) so callers can tell.
+"""
+
+#region imports
+import time
+import StateRegions
+#endregion
+
+#region solver stats
+stats = {}  # 'p-h' -> {'solves', 'iterations', 'calls', 'time'}
+_lastRoot = {}  # (pair, side) -> last root, used to warm start the next solve
+
+def resetStats():
+    """clears the solver counters and the warm start guesses"""
+    stats.clear()
+    _lastRoot.clear()
+
+def _record(pair, iterations, calls, seconds):
+    entry = stats.setdefault(pair, {'solves': 0, 'iterations': 0, 'calls': 0, 'time': 0.0})
+    entry['solves'] += 1
+    entry['iterations'] += iterations
+    entry['calls'] += calls
+    entry['time'] += seconds
+
+def report():
+    """
+    Per pair cost of the solves so far
+    :return: string table with solves, mean iterations, mean function calls and mean time per solve
+    """
+    lines = ["{:<6}{:>8}{:>10}{:>8}{:>12}".format("pair", "solves", "iter/ea", "f/ea", "ms/ea")]
+    for pair in sorted(stats):
+        e = stats[pair]
+        n = e['solves']
+        lines.append("{:<6}{:>8d}{:>10.2f}{:>8.2f}{:>12.4f}".format(pair, n, e['iterations'] / n, e['calls'] / n,
+                                                                  1000 * e['time'] / n))
+    return "\n".join(lines)
+#endregion
+
+#region limits
+_limitCache = {}
+
+def limits(steamTable):
+    """
+    Valid range of pyXSteam in the table's unit system: pmin, pmax, pc, tmin, tmax, tc and pBand
+    (pyXSteam calls anything within 1e-5 MPa of saturation region 4, so single phase brackets stop that far off),
+    plus tRhoMax, where liquid water is densest and v(T) turns around
+    """
+    key = (steamTable.criticalPressure(), steamTable.criticalTemperatur())
+    lim = _limitCache.get(key)
+    if lim is None:
+        pc, tc = key
+        ttp = steamTable.triplePointTemperatur()
+        toUnits = lambda tC: ttp + (tC - 0.01) * (tc - ttp) / (373.946 - 0.01)  # C -> table units, works for C or F
+        pPerMPa = pc / 22.06395
+        lim = _limitCache[key] = {'pmin': steamTable.triplePointPressure(), 'pmax': 100.0 * pPerMPa, 'pc': pc,
+                                  'tmin': toUnits(0.01), 'tmax': toUnits(800.0), 'tc': tc, 'pBand': 1.5e-5 * pPerMPa,
+                                  'tRhoMax': toUnits(3.98)}
+    return lim
+#endregion
+
+#region state helpers
+def twoPhase_p(steamTable, p, x, t=None):
+    """two-phase state from pressure and quality"""
+    st = steamTable
+    state = {'p': p, 't': st.tsat_p(p) if t is None else t, 'x': x, 'region': "two-phase"}
+    for prop in ('v', 'u', 'h', 's'):
+        yL = getattr(st, prop + 'L_p')(p)
+        state[prop] = yL + x * (getattr(st, prop + 'V_p')(p) - yL)
+    return state
+
+def twoPhase_t(steamTable, t, x):
+    """two-phase state from temperature and quality"""
+    st = steamTable
+    state = {'p': st.psat_t(t), 't': t, 'x': x, 'region': "two-phase"}
+    for prop in ('v', 'u', 'h', 's'):
+        yL = getattr(st, prop + 'L_t')(t)
+        state[prop] = yL + x * (getattr(st, prop + 'V_t')(t) - yL)
+    return state
+
+def singlePhase(steamTable, p, t):
+    """single phase state from p and t, region from the classifier with no two-phase band (it's single phase already)"""
+    st = steamTable
+    return {'p': p, 't': t, 'x': -1.0,
+            'region': StateRegions.regionClassifier.get(st).regionOf(p, t, tol=0.0),
+            'v': st.v_pt(p, t), 'u': st.u_pt(p, t), 'h': st.h_pt(p, t), 's': st.s_pt(p, t)}
+
+def _blend(satState, edgeState, w, region):
+    """linear blend between the saturated state and the first state pyXSteam will evaluate past the region 4 band"""
+    state = {k: satState[k] + w * (edgeState[k] - satState[k]) for k in ('p', 't', 'v', 'u', 'h', 's')}
+    state['x'] = -1.0
+    state['region'] = region
+    return state
+#endregion
+
+def _solve(f, lo, hi, guess, pair, side):
+    """
+    Bracketed root of f between lo and hi, trying a tight bracket around the guess first
+    :return: the root
+    """
+    from scipy.optimize import brentq  # scipy only loads once a solve actually needs it
+    start = time.perf_counter()
+    calls = 0
+    if guess is None:
+        guess = _lastRoot.get((pair, side))
+    a, b = lo, hi
+    if guess is not None and lo < guess < hi:
+        d = 1e-3 * (hi - lo)
+        ga, gb = max(lo, guess - d), min(hi, guess + d)
+        calls += 2
+        if f(ga) * f(gb) <= 0:
+            a, b = ga, gb
+    fa, fb = f(a), f(b)
+    calls += 2
+    if not fa * fb <= 0:  # also catches nan from pyXSteam
+        raise ValueError(f"No {side} state found for the {pair} pair in the valid range")
+    root, r = brentq(f, a, b, xtol=1e-12, rtol=1e-12, full_output=True)
+    _lastRoot[(pair, side)] = root
+    _record(pair, r.iterations, calls + r.function_calls, time.perf_counter() - start)
+    return root
+
+def solve_p(steamTable, p, prop, val, guess=None):
+    """
+    State from pressure and one of h, s, u, v, x
+    :param guess: starting T for the solve (e.g. the last sample's), defaults to the backward equations or last root
+    :return: dict with p, t, v, u, h, s, x and region
+    """
+    st = steamTable
+    lim = limits(st)
+    pair = 'p-' + prop
+    if prop == 'x':
+        return twoPhase_p(st, p, val)
+    f = lambda T: getattr(st, prop + '_pt')(p, T) - val
+    if guess is None:
+        guess = st.t_ph(p, val) if prop == 'h' else st.t_ps(p, val) if prop == 's' else None
+    if p >= lim['pc']:  # no dome, one sweep over the whole range
+        return singlePhase(st, p, _solve(f, lim['tmin'], lim['tmax'], guess, pair, "supercritical"))
+
+    yL, yV = getattr(st, prop + 'L_p')(p), getattr(st, prop + 'V_p')(p)
+    if yL <= val <= yV:
+        state = twoPhase_p(st, p, (val - yL) / (yV - yL))
+        _record(pair, 0, 0, 0.0)
+        return state
+    if val < yL:  # liquid side of the dome
+        # a bit under tsat, where psat(T) is pBand below p so pyXSteam still calls it region 1
+        side, satX, lo, hi = "subcooled", 0.0, lim['tmin'], st.tsat_p(max(p - lim['pBand'], lim['pmin']))
+        edge = hi
+    else:
+        side, satX, lo, hi = "superheated", 1.0, st.tsat_p(min(p + lim['pBand'], lim['pc'])), lim['tmax']
+        edge = lo
+    yEdge = f(edge) + val
+    ySat = yL if satX == 0.0 else yV
+    if (val - ySat) * (val - yEdge) <= 0:  # val sits in the sliver pyXSteam won't evaluate next to saturation
+        return _blend(twoPhase_p(st, p, satX), singlePhase(st, p, edge), (val - ySat) / (yEdge - ySat), side)
+    if prop == 'v' and side == "subcooled":
+        lo = max(lo, lim['tRhoMax'])  # v(T) dips near 4 C, colder than that the same v shows up twice so take the warm one
+    return singlePhase(st, p, _solve(f, lo, hi, guess, pair, side))
+
+def solve_t(steamTable, t, prop, val, guess=None):
+    """
+    State from temperature and one of h, s, u, v, x
+    :param guess: starting p for the solve, defaults to the last root for the pair
+    :return: dict with p, t, v, u, h, s, x and region
+    """
+    st = steamTable
+    lim = limits(st)
+    pair = 't-' + prop
+    if prop == 'x':
+        return twoPhase_t(st, t, val)
+    f = lambda P: getattr(st, prop + '_pt')(P, t) - val
+    if t >= lim['tc']:
+        return singlePhase(st, _solve(f, lim['pmin'], lim['pmax'], guess, pair, "supercritical"), t)
+
+    yL, yV = getattr(st, prop + 'L_t')(t), getattr(st, prop + 'V_t')(t)
+    psat = st.psat_t(t)
+    if min(yL, yV) <= val <= max(yL, yV):
+        state = twoPhase_t(st, t, (val - yL) / (yV - yL))
+        # a compressed liquid can land between yL and yV too (h and u of cold liquid rise with p, so does s
+        # under 4 C), then it's read as two-phase like the tables do but flagged so the caller can tell
+        if _liquidReaches(f, psat + lim['pBand'], lim['pmax'], prop == 's' and t < lim['tRhoMax']):
+            state['ambiguous'] = True
+        _record(pair, 0, 0, 0.0)
+        return state
+    # values past yL are on the liquid side (compressed liquid), past yV on the vapor side
+    if (val - yL) * (yV - yL) < 0:
+        side, satX, pLo, pHi = "subcooled", 0.0, psat + lim['pBand'], lim['pmax']
+        edge = pLo
+    else:
+        side, satX, pLo, pHi = "superheated", 1.0, lim['pmin'], psat - lim['pBand']
+        edge = pHi
+    yEdge = f(edge) + val
+    ySat = yL if satX == 0.0 else yV
+    if (val - ySat) * (val - yEdge) <= 0:
+        return _blend(twoPhase_t(st, t, satX), singlePhase(st, edge, t), (val - ySat) / (yEdge - ySat), side)
+    fEdge, fFar = yEdge - val, f(pLo if edge == pHi else pHi)
+    if fEdge * fFar > 0:  # no sign change over the side, the root can still be there if prop(p) turns around
+        pTurn = _turningPoint(f, pLo, pHi, fEdge)
+        if pTurn is not None:  # then there's one on each side of the turn, the one nearer the dome is taken
+            pLo, pHi = (pLo, pTurn) if edge == pLo else (pTurn, pHi)
+    return singlePhase(st, _solve(f, pLo, pHi, guess, pair, side), t)
+
+def _liquidReaches(f, lo, hi, interior):
+    """
+    True if some compressed liquid state between lo and hi has f >= 0, i.e. reaches a value inside the dome
+    :param interior: True if f(p) can peak inside the range (s under 4 C), otherwise the ends are enough since
+        the props either rise with p or dip to a minimum first
+    """
+    fLo, fHi = f(lo), f(hi)
+    if max(fLo, fHi) >= 0:
+        return True
+    return interior and _turningPoint(f, lo, hi, fLo) is not None
+
+def _turningPoint(f, lo, hi, fEnd):
+    """
+    Where f(p) turns back toward zero between lo and hi, for the props that aren't monotone in p at a fixed T:
+    h of hot compressed liquid drops with p (dh/dp = v (1 - T beta) < 0) down to a minimum and comes back up,
+    s of liquid under 4 C goes through a maximum
+    :return: p at the extremum if f crosses zero there, None if it doesn't (then there's no root on this side)
+    """
+    from scipy.optimize import minimize_scalar
+    sign = 1.0 if fEnd > 0 else -1.0  # f at either end, look for a minimum if it's positive there, a maximum otherwise
+    r = minimize_scalar(lambda P: sign * f(P), bounds=(lo, hi), method='bounded', options={'xatol': 1e-9 * (hi - lo)})
+    return r.x if sign * f(r.x) <= 0 else None
+
+def solveState(steamTable, prop1, val1, prop2, val2, guess=None):
+    """
+    State from any pair that has p or t in it (except p-t itself, which pyXSteam does directly)
+    Args:
+        steamTable: the XSteam-like object to evaluate with, sets the unit system
+        prop1, val1: 'p' or 't' and its value
+        prop2, val2: one of 'h', 's', 'u', 'v', 'x' and its value
+        guess: optional starting value for the unknown (T for the p pairs, p for the T pairs)
+    Returns:
+        dict with p, t, v, u, h, s, x and region
+    """
+    if prop1 == 'p':
+        return solve_p(steamTable, val1, prop2, val2, guess)
+    if prop1 == 't':
+        return solve_t(steamTable, val1, prop2, val2, guess)
+    raise ValueError(f"Unsupported property combination: {prop1} and {prop2}")
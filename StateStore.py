@@ -0,0 +1,157 @@
+"""
+Persistent setState results in an SQLite file, so a state worked out once doesn't have to be worked out again
+in the next run (or by another process).  Rows are keyed by unit system, property pair and the two values rounded
+to a number of significant digits.  A hit hands back the stored state without going near pyXSteam.
+thermoState asks in SI even for english states (it converts at its edges), so one row serves both unit systems.
+Only exact states get stored, a fast (interpolated) thermoState reads rows but never writes them.
+
+The file runs in WAL mode, so any number of processes can read while one writes, and each process (each
+ThermoParallel worker for example) just opens its own stateStore on the same path.  New rows are written in
+batches.  Once the file holds more than maxRows, the least recently used rows get dropped.
+
+    store = stateStore('states.sqlite')
+    state = thermoState(store=store)
+    state.setState('p', 't', 10.0, 300.0)
+    print(store.report())
+"""
+
+#region imports
+import os
+import time
+import sqlite3
+import threading
+#endregion
+
+columns = ('region', 'p', 't', 'u', 'h', 's', 'v', 'x')
+
+class stateStore:
+    """SQLite backed cache of setState results, see the module docstring"""
+    def __init__(self, path, maxRows=1000000, digits=12, batchSize=500):
+        """
+        :param path: file to keep the states in, made if it isn't there
+        :param maxRows: rows to keep, least recently used ones get evicted past this
+        :param digits: significant digits the input values are rounded to for the key
+        :param batchSize: new rows (and hit timestamps) held in memory before they get written
+        """
+        self.path = path
+        self.maxRows = maxRows
+        self.digits = digits
+        self.batchSize = batchSize
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._pending = {}  # key -> row waiting to be written
+        self._touched = {}  # key -> last used time for hits, written with the next batch
+        self._lock = threading.Lock()
+        self._closedStats = None
+        self._db = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer or each other
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS states (
+                            units TEXT, pair TEXT, val1 REAL, val2 REAL,
+                            region TEXT, p REAL, t REAL, u REAL, h REAL, s REAL, v REAL, x REAL, used REAL,
+                            PRIMARY KEY (units, pair, val1, val2)) WITHOUT ROWID""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS states_used ON states (used)")
+
+    def key(self, prop1, prop2, val1, val2, SI=True):
+        """the lookup key, pair in alphabetical order so ('t', 'p') finds what ('p', 't') stored"""
+        if prop2 < prop1:
+            prop1, prop2, val1, val2 = prop2, prop1, val2, val1
+        fmt = f"{{:.{self.digits}g}}"
+        return ('SI' if SI else 'EN', prop1 + '-' + prop2, float(fmt.format(val1)), float(fmt.format(val2)))
+
+    def get(self, prop1, prop2, val1, val2, SI=True):
+        """
+        Looks up a state
+        :return: dict with region, p, t, u, h, s, v and x, None if it isn't stored
+        """
+        key = self.key(prop1, prop2, val1, val2, SI)
+        with self._lock:
+            row = self._pending.get(key)
+            if row is None:
+                row = self._db.execute("SELECT region, p, t, u, h, s, v, x FROM states "
+                                       "WHERE units=? AND pair=? AND val1=? AND val2=?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+        return dict(zip(columns, row))
+
+    def put(self, prop1, prop2, val1, val2, state, SI=True):
+        """
+        Stores a state, it gets written with the next batch
+        :param state: thermoState or dict with region, p, t, u, h, s, v and x
+        """
+        key = self.key(prop1, prop2, val1, val2, SI)
+        get = state.get if isinstance(state, dict) else lambda name: getattr(state, name)
+        row = (get('region'),) + tuple(float(get(name)) for name in columns[1:])
+        with self._lock:
+            self._pending[key] = row
+            if len(self._pending) + len(self._touched) >= self.batchSize:
+                self._flush()
+
+    def flush(self):
+        """writes the pending rows and hit times, then evicts if the file is over maxRows"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending and not self._touched:
+            return
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")  # take the write lock up front, other processes wait on the timeout
+        try:
+            db.executemany("INSERT OR REPLACE INTO states VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                           [key + row + (now,) for key, row in self._pending.items()])
+            db.executemany("UPDATE states SET used=? WHERE units=? AND pair=? AND val1=? AND val2=?",
+                           [(used,) + key for key, used in self._touched.items()])
+            rows = db.execute("SELECT COUNT(*) FROM states").fetchone()[0]
+            if rows > self.maxRows:
+                drop = rows - int(0.9 * self.maxRows)  # evict down to 90 % so it doesn't happen every batch
+                db.execute("DELETE FROM states WHERE (units, pair, val1, val2) IN "
+                           "(SELECT units, pair, val1, val2 FROM states ORDER BY used LIMIT ?)", (drop,))
+                self.evictions += drop
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.writes += len(self._pending)
+        self._pending.clear()
+        self._touched.clear()
+
+    def close(self):
+        """flushes and closes the file, stats() keeps working off the numbers at closing time"""
+        if self._db is None:
+            return
+        self.flush()
+        self._closedStats = self.stats()
+        self._db.close()
+        self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def stats(self):
+        """:return: dict with hits, misses, hitRate, writes, evictions, rows in the file and file size in bytes"""
+        if self._db is None:
+            return self._closedStats
+        with self._lock:
+            rows = self._db.execute("SELECT COUNT(*) FROM states").fetchone()[0] + len(self._pending)
+        lookups = self.hits + self.misses
+        size = sum(os.path.getsize(self.path + ext) for ext in ('', '-wal') if os.path.exists(self.path + ext))
+        return {'hits': self.hits, 'misses': self.misses, 'hitRate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes, 'evictions': self.evictions, 'rows': rows, 'bytes': size}
+
+    def report(self):
+        """one line summary of stats() for the end of a run"""
+        st = self.stats()
+        return ("state cache {}: {hits} hits, {misses} misses ({:.1%} hit rate), {writes} written, "
+                "{evictions} evicted, {rows} rows, {:.1f} MB").format(self.path, st['hitRate'], st['bytes'] / 1e6,
+                                                                    **st)
@@ -0,0 +1,292 @@
+"""
+Qt table model for comparing any number of states side by side, with each state's change from a reference state.
+The values live in one SI stateBatch (grown by doubling), the view asks for text cell by cell, so:
+    - QTableView only asks for the rows on screen, thousands of states scroll like a handful
+    - a unit switch just converts and formats whatever's on screen next, nothing gets recomputed
+    - adding a state or editing one of a row's two input values recomputes that row and nothing else
+      (plus a repaint of the delta columns if it's the reference row)
+    - an edit doesn't compute anything itself, it goes out as editRequested so the owner can work the state out
+      off the GUI thread (the solved pairs take a while) and hand it back with setRowState
+
+    model = stateTableModel()
+    model.addState('p', 't', 10.0, 300.0)
+    view = QTableView()
+    view.setModel(model)
+"""
+
+#region imports
+import math
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QFont
+from ThermoCore import thermoState
+from ThermoBatch import stateBatch
+from StateRegions import REGIONS, REGION_UNKNOWN
+from UnitConversion import UC
+#endregion
+
+class stateTableModel(QAbstractTableModel):
+    """
+    One row per state: region, p, t, u, h, s, v and x, then the change of each one from the reference row.
+    The two properties a state was specified by are editable in place.
+    """
+    editRequested = pyqtSignal(int, object)  # row, (prop1, prop2, val1, val2) in SI after an in-place edit
+    rowFailed = pyqtSignal(int, str)  # row, message when an edit can't be used (the row keeps its old state)
+
+    #region class attributes
+    props = ('p', 't', 'u', 'h', 's', 'v', 'x')
+    deltaProps = ('p', 't', 'u', 'h', 's', 'v')
+    formats = {'v': "{:0.6f}"}  # everything else gets "{:0.3f}", like the old labels
+    #endregion
+
+    def __init__(self, units='SI', fast=None, backend=None, parent=None):
+        """
+        :param units: 'SI' or 'EN', what the cells show and edits are typed in
+        :param fast, backend: passed on to thermoState for the rows the model computes itself
+        """
+        super().__init__(parent)
+        self.fast = fast
+        self.backend = backend
+        self._batch = stateBatch(16)  # SI values, only the first self._n rows are real
+        self._n = 0
+        self._inputs = []  # per row (prop1, prop2, val1, val2), values in SI
+        self._labels = []  # per row vertical header text
+        self._made = 0  # states added so far, for the labels
+        self.reference = None  # row the deltas are taken from
+        self.setUnits(units)
+
+    #region Qt model interface
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._n
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1 + len(self.props) + len(self.deltaProps)
+
+    def _column(self, c):
+        """(kind, prop) for a column: ('region', None), ('value', 'p') or ('delta', 'p')"""
+        if c == 0:
+            return 'region', None
+        if c <= len(self.props):
+            return 'value', self.props[c - 1]
+        return 'delta', self.deltaProps[c - 1 - len(self.props)]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r = index.row()
+        kind, q = self._column(index.column())
+        if role == Qt.DisplayRole:
+            if kind == 'region':
+                return REGIONS[self._batch.region[r]]
+            val = self._value(r, q, kind)
+            return "" if math.isnan(val) else self.formats.get(q, "{:0.3f}").format(val)
+        if role == Qt.EditRole and kind == 'value':
+            return self._value(r, q, kind)
+        if role == Qt.TextAlignmentRole and kind != 'region':
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.FontRole and r == self.reference:
+            font = QFont()
+            font.setBold(True)
+            return font
+        if role == Qt.ToolTipRole:
+            prop1, prop2, val1, val2 = self._inputs[r]
+            return "{}: {} = {:0.6g} {}, {} = {:0.6g} {}".format(
+                self._labels[r], prop1, UC.convert(val1, prop1, 'SI', self.units), UC.units(prop1, self.units),
+                prop2, UC.convert(val2, prop2, 'SI', self.units), UC.units(prop2, self.units))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return self._labels[section] + (" (ref)" if section == self.reference else "")
+        kind, q = self._column(section)
+        if kind == 'region':
+            return "Region"
+        name = q if kind == 'value' else "Δ" + q
+        units = UC.units(q, self.units)
+        return f"{name} ({units})" if units else name
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        kind, q = self._column(index.column())
+        if kind == 'value' and q in self._inputs[index.row()][:2]:
+            flags |= Qt.ItemIsEditable  # only the two values the state was specified by
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """
+        Edit of one of a row's input values.  Nothing gets computed here, the new inputs go out as editRequested
+        and the row keeps showing its old state until the result comes back through setRowState
+        """
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        r = index.row()
+        kind, q = self._column(index.column())
+        prop1, prop2, val1, val2 = self._inputs[r]
+        if kind != 'value' or q not in (prop1, prop2):
+            return False
+        try:
+            val = float(value)
+        except (ValueError, TypeError):
+            self.rowFailed.emit(r, f"Error in {self._labels[r]}: {value!r} isn't a number")
+            return False
+        val = UC.convert(val, q, self.units, 'SI')
+        self.editRequested.emit(r, (prop1, prop2, val, val2) if q == prop1 else (prop1, prop2, val1, val))
+        return True
+    #endregion
+
+    #region adding, editing and removing states
+    def addState(self, prop1, prop2, val1, val2, SI=True, label=None):
+        """
+        Works out a state and appends it, raises ValueError (and adds nothing) if it can't be evaluated
+        :param SI: False if val1 and val2 are english
+        :return: the new row
+        """
+        inputs = self._toSI(prop1, prop2, val1, val2, SI)
+        return self.appendState(self._compute(*inputs), inputs, label)
+
+    def appendState(self, state, inputs, label=None):
+        """
+        Appends a state that was worked out somewhere else (a worker thread for example), no recomputing
+        :param state: thermoState (or anything with region, p, t, u, h, s, v, x and SI)
+        :param inputs: (prop1, prop2, val1, val2) the state was specified by, in the state's units
+        :return: the new row
+        """
+        r = self._n
+        self.beginInsertRows(QModelIndex(), r, r)
+        self._reserve(r + 1)
+        self._n += 1
+        self._made += 1
+        self._inputs.append(None)
+        self._labels.append(label or f"State {self._made}")
+        self._store(r, state, self._toSI(*inputs, getattr(state, 'SI', True)))
+        if self.reference is None:
+            self.reference = r  # first one in is the reference until somebody picks another
+        self.endInsertRows()
+        return r
+
+    def setRowState(self, row, state, inputs):
+        """replaces row with a state worked out somewhere else, same arguments as appendState"""
+        self._store(row, state, self._toSI(*inputs, getattr(state, 'SI', True)))
+        self._rowChanged(row)
+
+    def removeStates(self, rows):
+        """drops the given rows, the reference moves to the first row if it was one of them"""
+        for r in sorted(set(rows), reverse=True):
+            self.beginRemoveRows(QModelIndex(), r, r)
+            for name in stateBatch.__slots__:
+                col = getattr(self._batch, name)
+                col[r:self._n - 1] = col[r + 1:self._n]
+            self._n -= 1
+            del self._inputs[r], self._labels[r]
+            if self.reference is not None and self.reference >= r:
+                self.reference = None if self.reference == r else self.reference - 1
+            self.endRemoveRows()
+        if self.reference is None and self._n:
+            self.setReference(0)
+
+    def clear(self):
+        """drops every state"""
+        self.beginResetModel()
+        self._n = 0
+        self._inputs.clear()
+        self._labels.clear()
+        self.reference = None
+        self.endResetModel()
+
+    def setReference(self, row):
+        """makes row the one the deltas are taken from, only the delta columns and the two header rows change"""
+        old, self.reference = self.reference, row
+        for r in (old, row):
+            if r is not None and r < self._n:
+                self.headerDataChanged.emit(Qt.Vertical, r, r)
+                self.dataChanged.emit(self.index(r, 0), self.index(r, self.columnCount() - 1), [Qt.FontRole])
+        self._deltasChanged()
+    #endregion
+
+    #region units
+    def setUnits(self, units):
+        """switches what the cells show, the SI values stay as they are so nothing gets recomputed"""
+        self.units = units
+        self._factors = {q: UC.factor(q, 'SI', units) for q in self.props}
+        self._factors['dt'] = UC.factor('dt', 'SI', units)
+        if self.columnCount():
+            self.headerDataChanged.emit(Qt.Horizontal, 0, self.columnCount() - 1)
+        if self._n:  # the view only repaints (and so only formats) the cells on screen
+            self.dataChanged.emit(self.index(0, 0), self.index(self._n - 1, self.columnCount() - 1),
+                                  [Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole])
+    #endregion
+
+    #region reading states back out
+    def label(self, row):
+        """vertical header text of a row, 'State 3' and such"""
+        return self._labels[row]
+
+    def state(self, row):
+        """dict with region, p, t, u, h, s, v and x of one row in the model's units"""
+        out = {q: self._value(row, q, 'value') for q in self.props}
+        out['region'] = REGIONS[self._batch.region[row]]
+        return out
+
+    def states(self):
+        """stateBatch copy of every row in the model's units, for the chart markers and such"""
+        out = stateBatch(self._n)
+        for name in stateBatch.__slots__:
+            getattr(out, name)[:] = getattr(self._batch, name)[:self._n]
+        if self.units != 'SI':
+            UC.convertColumns(out, 'SI', self.units)
+        return out
+    #endregion
+
+    #region helpers
+    def _value(self, r, q, kind):
+        """one cell's number in the model's units, deltas get the scale only (t as a temperature difference)"""
+        col = getattr(self._batch, q)
+        if kind == 'delta':
+            if self.reference is None:
+                return math.nan
+            return (col[r] - col[self.reference]) * self._factors['dt' if q == 't' else q][0]
+        scale, offset = self._factors[q]
+        return float(col[r]) * scale + offset
+
+    def _compute(self, prop1, prop2, val1, val2):
+        """SI thermoState for one row's inputs"""
+        state = thermoState(fast=self.fast, backend=self.backend)
+        state.setState(prop1, prop2, val1, val2)
+        return state
+
+    @staticmethod
+    def _toSI(prop1, prop2, val1, val2, SI):
+        if SI:
+            return prop1, prop2, float(val1), float(val2)
+        return prop1, prop2, UC.convert(val1, prop1, 'EN', 'SI'), UC.convert(val2, prop2, 'EN', 'SI')
+
+    def _reserve(self, n):
+        """grows the batch by doubling so appending thousands of rows doesn't copy every time"""
+        if n <= len(self._batch):
+            return
+        bigger = stateBatch(max(n, 2 * len(self._batch)))
+        for name in stateBatch.__slots__:
+            getattr(bigger, name)[:self._n] = getattr(self._batch, name)[:self._n]
+        self._batch = bigger
+
+    def _store(self, r, state, inputs):
+        """writes a state into row r of the batch in SI"""
+        SI = getattr(state, 'SI', True)
+        for q in self.props:
+            val = getattr(state, q)
+            getattr(self._batch, q)[r] = val if SI or q == 'x' else UC.convert(val, q, 'EN', 'SI')
+        self._batch.region[r] = REGIONS.index(state.region) if state.region in REGIONS else REGION_UNKNOWN
+        self._inputs[r] = inputs
+
+    def _rowChanged(self, r):
+        self.dataChanged.emit(self.index(r, 0), self.index(r, self.columnCount() - 1))
+        if r == self.reference:
+            self._deltasChanged()  # every row's deltas move with the reference
+
+    def _deltasChanged(self):
+        if self._n:
+            first = 1 + len(self.props)
+            self.dataChanged.emit(self.index(0, first), self.index(self._n - 1, self.columnCount() - 1),
+                                  [Qt.DisplayRole])
+    #endregion
@@ -0,0 +1,149 @@
+#region imports
+import threading
+from SatCache import satCache
+#endregion
+
+def _XSteam():
+    """the XSteam class, pyXSteam only gets imported the first time a table is needed"""
+    from pyXSteam.XSteam import XSteam
+    return XSteam
+
+class steamTables():
+    """
+    Hands out XSteam objects so we don't build a new one for every state.
+    There is one shared table per unit system (MKS for SI, FLS for english), made the first time it is asked for.
+    thermoState, setStates and the rest of the core only ever ask for the SI one and convert english at their edges
+    through UC, so the english table (and its caches) only get built if something outside the core wants them.
+    Callers running on their own threads can ask for a thread local copy instead, for example:
+        steamTables.get(SI=True)  # the shared SI table
+        steamTables.get(SI=False, threadLocal=True)  # english table owned by the calling thread
+        steamTables.cached(SI=True)  # the shared SI table behind a memoized saturation layer
+        steamTables.sat(SI=True, fast=True)  # interpolated saturation dome, ~1e-5 relative error but much faster
+        steamTables.sat(backend='if97')  # NumPy IF97 regions 1, 2 and 4, whole arrays per call (see IF97.py)
+    """
+    #region class attributes
+    created = 0  # how many XSteam objects have been built so far
+    _shared = {}  # unit system -> shared XSteam
+    _cached = {}  # unit system -> shared satCache around the shared XSteam
+    cacheSize = 4096  # max entries per saturation function in the shared caches
+    cacheQuantum = None  # input rounding for the shared caches, None keeps exact values
+    fastSat = False  # default for sat(), True switches everyone over to the interpolated satTable
+    _satTables = {}  # unit system -> shared satTable
+    backend = 'pyXSteam'  # default for sat(), 'if97' switches everyone over to IF97.if97Table
+    backends = ('pyXSteam', 'if97')
+    _if97 = None  # shared if97Table
+    _local = threading.local()  # per thread dict of unit system -> XSteam
+    _lock = threading.Lock()
+    #endregion
+
+    @classmethod
+    def unitSystem(cls, SI=True):
+        """the XSteam unit system constant for SI or english"""
+        XSteam = _XSteam()
+        return XSteam.UNIT_SYSTEM_MKS if SI else XSteam.UNIT_SYSTEM_FLS
+
+    @classmethod
+    def _make(cls, units):
+        with cls._lock:
+            cls.created += 1
+        return _XSteam()(units)
+
+    @classmethod
+    def get(cls, SI=True, threadLocal=False):
+        """
+        Gets the steam table for a unit system, building it on first use
+        :param SI: True for the MKS table, False for the FLS (english) table
+        :param threadLocal: True to get a table owned by the calling thread
+        :return: an XSteam object
+        """
+        units = cls.unitSystem(SI)
+        if threadLocal:
+            tables = cls._local.__dict__.setdefault('tables', {})
+            if units not in tables:
+                tables[units] = cls._make(units)
+            return tables[units]
+        table = cls._shared.get(units)
+        if table is None:
+            with cls._lock:
+                table = cls._shared.get(units)
+                if table is None:
+                    cls.created += 1
+                    table = cls._shared[units] = _XSteam()(units)
+        return table
+
+    @classmethod
+    def cached(cls, SI=True):
+        """
+        Gets the shared table for a unit system wrapped in a satCache, so repeated saturation lookups are dict hits
+        :param SI: True for the MKS table, False for the FLS (english) table
+        :return: a satCache that can be used like an XSteam object
+        """
+        units = cls.unitSystem(SI)
+        cache = cls._cached.get(units)
+        if cache is None:
+            table = cls.get(SI)
+            with cls._lock:
+                cache = cls._cached.setdefault(units, satCache(table, cls.cacheSize, cls.cacheQuantum))
+        return cache
+
+    @classmethod
+    def interpolated(cls, SI=True):
+        """Gets the shared satTable for a unit system, building it from pyXSteam the first time (takes ~1 s)"""
+        units = cls.unitSystem(SI)
+        table = cls._satTables.get(units)
+        if table is None:
+            from SatTable import satTable  # scipy comes in with it, only once somebody wants the fast table
+            table = satTable(cls.get(SI))
+            with cls._lock:
+                table = cls._satTables.setdefault(units, table)
+        return table
+
+    @classmethod
+    def if97(cls):
+        """Gets the shared IF97.if97Table, SI (MKS) only"""
+        table = cls._if97
+        if table is None:
+            from IF97 import if97Table
+            with cls._lock:
+                if cls._if97 is None:
+                    cls._if97 = if97Table()
+                table = cls._if97
+        return table
+
+    @classmethod
+    def sat(cls, SI=True, fast=None, backend=None):
+        """
+        The table thermoState and friends should use for saturation lookups
+        :param SI: True for SI units, False for english
+        :param fast: True for the interpolated satTable, False for the exact memoized one, None uses steamTables.fastSat
+        :param backend: 'pyXSteam' or 'if97', None uses steamTables.backend.  fast only applies to pyXSteam,
+            if97 is exact and takes arrays anyway
+        :return: a satTable, satCache or if97Table, all work like an XSteam object
+        """
+        backend = cls.backend if backend is None else backend
+        if backend == 'if97':
+            if not SI:
+                raise ValueError("the if97 backend only comes in SI units")
+            return cls.if97()
+        if backend != 'pyXSteam':
+            raise ValueError(f"Unknown steam table backend: {backend}, expected one of {cls.backends}")
+        fast = cls.fastSat if fast is None else fast
+        return cls.interpolated(SI) if fast else cls.cached(SI)
+
+    @classmethod
+    def cacheStats(cls):
+        """hit/miss stats of the shared saturation caches, keyed by 'SI' or 'EN'"""
+        return {('SI' if units == cls.unitSystem(True) else 'EN'): cache.stats() for units, cache in cls._cached.items()}
+
+    @classmethod
+    def clear(cls):
+        """drops the shared tables and caches (and the calling thread's local tables) and resets the counter"""
+        with cls._lock:
+            for cache in cls._cached.values():
+                cache.clear()
+            cls._cached.clear()
+            cls._satTables.clear()
+            cls._if97 = None
+            cls._shared.clear()
+            cls.created = 0
+        cls._local.__dict__.pop('tables', None)
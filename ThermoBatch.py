@@ -0,0 +1,400 @@
+#region imports
+import sys
+import numpy as np
+from ThermoCore import thermoState
+from SteamTables import steamTables
+from SatTable import satTable
+from IF97 import if97Table, b23t
+import StateSolvers
+import ThermoTrace
+import StateInverse
+from StateRegions import regionClassifier, REGIONS, REGION_UNKNOWN, REGION_TWOPHASE
+from UnitConversion import UC
+#endregion
+
+class stateBatch:
+    """
+    struct-of-arrays version of thermoState, one float64 column per property and an int8 region code.
+    A row costs 57 bytes this way, vs. a few hundred for a thermoState object with its dict and float objects.
+    batch[i] gives a stateRow view with the same attribute names as thermoState, batch2 - batch1 subtracts whole columns.
+    """
+    columns = ('p', 't', 'u', 'h', 's', 'v', 'x')
+    __slots__ = columns + ('region',)
+
+    def __init__(self, n):
+        self.p = np.zeros(n)  # Pressure
+        self.t = np.zeros(n)  # Temperature
+        self.u = np.zeros(n)  # Internal Energy
+        self.h = np.zeros(n)  # Enthalpy
+        self.s = np.zeros(n)  # Entropy
+        self.v = np.zeros(n)  # Specific Volume
+        self.x = np.full(n, -1.0)  # Quality (-1 for single phase, same as thermoState)
+        self.region = np.full(n, REGION_UNKNOWN, dtype=np.int8)  # codes from REGIONS
+
+    @classmethod
+    def fromStates(cls, states):
+        """packs a list of thermoState (or anything with the same attributes) into a batch"""
+        states = list(states)
+        out = cls(len(states))
+        for name in cls.columns:
+            getattr(out, name)[:] = [getattr(st, name) for st in states]
+        out.region[:] = [REGIONS.index(st.region) for st in states]
+        return out
+
+    def __len__(self):
+        return len(self.p)
+
+    def __getitem__(self, i):
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError("stateBatch index out of range")
+        return stateRow(self, i % n)
+
+    def __iter__(self):
+        return (stateRow(self, i) for i in range(len(self)))
+
+    def regionName(self, i):
+        """region string for row i, matches thermoState.region"""
+        return REGIONS[self.region[i]]
+
+    def delta(self, other, out=None):
+        """
+        Property change other -> self for every row, like thermoState.__sub__ but a whole column at a time
+        :param other: stateBatch of the same length, or a single stateRow/thermoState to diff every row against
+        :param out: stateBatch to write into (can be self), saves allocating a new one in a loop
+        :return: stateBatch of differences, x is left at -1 and region unknown same as thermoState.__sub__
+        """
+        if out is None:
+            out = stateBatch(len(self))
+        for name in self.columns[:-1]:  # no x, same as thermoState
+            np.subtract(getattr(self, name), getattr(other, name), out=getattr(out, name))
+        if out is not self:
+            out.x.fill(-1.0)
+        out.region.fill(REGION_UNKNOWN)
+        return out
+
+    def __sub__(self, other):
+        return self.delta(other)
+
+    def derivatives(self, SI=True, steamTable=None, fast=None, backend=None):
+        """
+        cp, cv, (dv/dT)_p, (dv/dp)_T and (dh/dp)_T for every row, all rows' perturbed points in one batched
+        evaluation (see StateDerivatives)
+        :param SI: False if the batch is in english units, same as what setStates was given
+        :param steamTable, fast, backend: same as setStates
+        :return: dict of arrays with cp, cv, dvdT, dvdp and dhdp, nan on two-phase rows
+        """
+        import StateDerivatives
+        return StateDerivatives.derivatives(self.p, self.t, self.region, self.h, self.v, SI, steamTable, fast, backend)
+
+    @property
+    def nbytes(self):
+        """bytes held by the columns"""
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def memoryFootprint(self):
+        """
+        Memory use for sizing jobs
+        :return: dict with bytes for the batch, bytes per row and an estimate for the same number of thermoState objects
+        """
+        n = len(self)
+        perRow = sum(getattr(self, name).itemsize for name in self.__slots__)
+        return {'rows': n, 'bytes': self.nbytes, 'bytesPerRow': perRow,
+                'thermoStateBytes': n * _thermoStateBytes()}
+
+class stateRow:
+    """
+    View of one row of a stateBatch with thermoState's attribute names, reads and writes go straight to the columns.
+    Only holds the batch and the index, so making one is cheap.
+    """
+    __slots__ = ('batch', 'i')
+
+    def __init__(self, batch, i):
+        self.batch = batch
+        self.i = i
+
+    @property
+    def region(self):
+        return REGIONS[self.batch.region[self.i]]
+
+    @region.setter
+    def region(self, name):
+        self.batch.region[self.i] = REGIONS.index(name)
+
+    def __sub__(self, other):
+        """difference as a plain thermoState, same as thermoState.__sub__"""
+        result = thermoState()
+        for name in stateBatch.columns[:-1]:
+            setattr(result, name, getattr(self, name) - getattr(other, name))
+        return result
+
+    def __repr__(self):
+        return "stateRow({}: {})".format(self.i, ", ".join(f"{name}={getattr(self, name):.6g}"
+                                                         for name in stateBatch.columns) + f", region={self.region}")
+
+def _column(name):
+    """property reading/writing one column of the row's batch"""
+    def get(self):
+        return float(getattr(self.batch, name)[self.i])
+    def set(self, val):
+        getattr(self.batch, name)[self.i] = val
+    return property(get, set)
+
+for _name in stateBatch.columns:
+    setattr(stateRow, _name, _column(_name))
+
+def _thermoStateBytes():
+    """rough size of one set thermoState: the object, its dict and the float objects (table and region are shared)"""
+    st = thermoState()
+    floats = [getattr(st, name) for name in stateBatch.columns]
+    return sys.getsizeof(st) + sys.getsizeof(st.__dict__) + sum(sys.getsizeof(f + 0.5) for f in floats)
+
+def _satProps_p(steamTable, p):
+    """
+    Evaluates the saturation properties once for each unique pressure in p
+    :param steamTable: the XSteam object to use
+    :param p: array of pressures
+    :return: dict of arrays (tsat, vL, vV, uL, uV, hL, hV, sL, sV) lined up with p
+    """
+    names = ('tsat', 'vL', 'vV', 'uL', 'uV', 'hL', 'hV', 'sL', 'sV')
+    if isinstance(ThermoTrace.unwrap(steamTable), if97Table):  # all of them in one pass over the array
+        sat = steamTable.satProps_p(p)
+        return {name: np.asarray(sat[name]) for name in names}
+    if isinstance(ThermoTrace.unwrap(steamTable), satTable):  # interpolated dome takes the whole array
+        return {name: np.asarray(getattr(steamTable, 'tsat_p' if name == 'tsat' else name + '_p')(p)) for name in names}
+    pu, inv = np.unique(p, return_inverse=True)  # only hit the library once per pressure
+    funcs = (steamTable.tsat_p, steamTable.vL_p, steamTable.vV_p, steamTable.uL_p, steamTable.uV_p,
+             steamTable.hL_p, steamTable.hV_p, steamTable.sL_p, steamTable.sV_p)
+    sat = {}
+    for name, f in zip(names, funcs):
+        sat[name] = np.array([f(pi) for pi in pu], dtype=float)[inv]
+    return sat
+
+def _mix(out, idx, sat, x):
+    """fills in the two-phase rows idx of out from the saturation props and quality x"""
+    out.x[idx] = x
+    out.region[idx] = REGION_TWOPHASE
+    out.v[idx] = sat['vL'] + x * (sat['vV'] - sat['vL'])
+    out.u[idx] = sat['uL'] + x * (sat['uV'] - sat['uL'])
+    out.h[idx] = sat['hL'] + x * (sat['hV'] - sat['hL'])
+    out.s[idx] = sat['sL'] + x * (sat['sV'] - sat['sL'])
+
+def _setStates_pt(steamTable, out, idx, p, t):
+    """
+    (p, t) rows, same region logic as thermoState.setState.  The classifier sorts them all out up front, so only
+    the two-phase rows need saturation props
+    """
+    out.p[idx] = p
+    out.t[idx] = t
+    codes = regionClassifier.get(steamTable).classify(p, t)
+    twoPhase = codes == REGION_TWOPHASE
+    if twoPhase.any():
+        # thermoState guesses x=0.5 here since p and t don't pin the quality down
+        _mix(out, idx[twoPhase], _satProps_p(steamTable, p[twoPhase]), 0.5)
+    single = ~twoPhase
+    if single.any():
+        _singlePhase(steamTable, out, idx[single], p[single], t[single], codes[single])
+
+def _singlePhase(steamTable, out, idx, p, t, codes, props=('v', 'u', 'h', 's')):
+    """
+    fills in single phase rows straight from (p, t) with their region codes already worked out,
+    props picks which columns get evaluated (the others stay as they were)
+    """
+    out.p[idx] = p
+    out.t[idx] = t
+    out.region[idx] = codes
+    out.x[idx] = -1.0
+    if isinstance(ThermoTrace.unwrap(steamTable), if97Table):  # whole columns in one pass, no repeats to look for
+        vals = steamTable.props_pt(p, t)
+        for col in props:
+            getattr(out, col)[idx] = vals[col]
+        return
+    # repeated (p, t) pairs only get evaluated once
+    pts, inv = np.unique(np.column_stack((p, t)), axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    for col in props:
+        f = getattr(steamTable, col + '_pt')
+        vals = np.array([f(pi, ti) for pi, ti in pts], dtype=float)
+        getattr(out, col)[idx] = vals[inv]
+
+def _setStates_px(steamTable, out, idx, p, x):
+    """(p, x) rows, always two-phase"""
+    out.p[idx] = p
+    sat = _satProps_p(steamTable, p)
+    out.t[idx] = sat['tsat']
+    _mix(out, idx, sat, x)
+
+def _setStates_tx(steamTable, out, idx, t, x):
+    """(t, x) rows, always two-phase, saturation props once per unique temperature"""
+    out.t[idx] = t
+    names = ('psat', 'vL', 'vV', 'uL', 'uV', 'hL', 'hV', 'sL', 'sV')
+    if isinstance(ThermoTrace.unwrap(steamTable), if97Table):
+        sat = {name: np.asarray(a) for name, a in steamTable.satProps_t(t).items()}
+    elif isinstance(ThermoTrace.unwrap(steamTable), satTable):
+        sat = {name: np.asarray(getattr(steamTable, 'psat_t' if name == 'psat' else name + '_t')(t)) for name in names}
+    else:
+        tu, inv = np.unique(t, return_inverse=True)
+        sat = {name: np.array([getattr(steamTable, 'psat_t' if name == 'psat' else name + '_t')(ti) for ti in tu],
+                              dtype=float)[inv] for name in names}
+    out.p[idx] = sat['psat']
+    _mix(out, idx, sat, x)
+
+def _solvedHandler(prop1, prop2):
+    """
+    handler for a pair that needs a 1-D solve (see StateSolvers), one solve per unique row.
+    For the p pairs the rows inside the dome are picked out first with one saturation lookup per unique p
+    and mixed as arrays, same test solve_p does, so only the single phase rows get solved
+    """
+    def handler(steamTable, out, idx, v1, v2):
+        if prop1 == 'p':
+            sat = _satProps_p(steamTable, v1)
+            yL, yV = sat[prop2 + 'L'], sat[prop2 + 'V']
+            inDome = (v1 < StateSolvers.limits(steamTable)['pc']) & (yL <= v2) & (v2 <= yV)
+            if inDome.any():
+                out.p[idx[inDome]] = v1[inDome]
+                out.t[idx[inDome]] = sat['tsat'][inDome]
+                _mix(out, idx[inDome], {k: a[inDome] for k, a in sat.items()},
+                     (v2[inDome] - yL[inDome]) / (yV[inDome] - yL[inDome]))
+                idx, v1, v2 = idx[~inDome], v1[~inDome], v2[~inDome]
+                if not len(idx):
+                    return
+        if prop1 == 'p' and isinstance(ThermoTrace.unwrap(steamTable), if97Table):
+            idx, v1, v2 = _solveIF97_p(steamTable, out, idx, v1, v2, prop2)
+            if not len(idx):
+                return
+        vals, inv = np.unique(np.column_stack((v1, v2)), axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        # sorted unique rows also means each solve starts right next to the last root
+        states = [StateSolvers.solveState(steamTable, prop1, a, prop2, b) for a, b in vals]
+        for col in ('p', 't', 'u', 'h', 's', 'v', 'x'):
+            getattr(out, col)[idx] = np.array([st[col] for st in states], dtype=float)[inv]
+        out.region[idx] = np.array([REGIONS.index(st['region']) for st in states], dtype=np.int8)[inv]
+    return handler
+
+def _solveIF97_p(steamTable, out, idx, p, val, prop):
+    """
+    Single phase (p, prop) rows on the if97 table, all T solves at once: same brackets as StateSolvers.solve_p
+    (with the supercritical one cut down to region 1 or region 2), then bisection on the whole array.  Rows solve_p would treat specially (the sliver next to the region 4 band,
+    no root in the bracket) are left for it
+    :return: idx, p, val of the rows left over
+    """
+    lim = StateSolvers.limits(steamTable)
+    sat = _satProps_p(steamTable, p)
+    over = p >= lim['pc']
+    liquid = ~over & (val < sat[prop + 'L'])
+    lo = np.where(liquid & (prop == 'v'), lim['tRhoMax'], lim['tmin'])
+    hi = np.full(len(p), lim['tmax'])
+    hi[liquid] = steamTable.tsat_p(np.maximum(p[liquid] - lim['pBand'], lim['pmin']))
+    vapor = ~over & ~liquid
+    lo[vapor] = steamTable.tsat_p(np.minimum(p[vapor] + lim['pBand'], lim['pc']))
+    f = lambda T, rows: steamTable.props_pt(p[rows], T)[prop] - val[rows]
+    every = np.arange(len(p))
+    if over.any():
+        # region 3 sits between 350 C and the B23 line up here and it's nan, so it's either the region 1 part
+        # or the region 2 part of the range, whichever brackets
+        rows = np.flatnonzero(over)
+        t1 = np.full(len(rows), 350.0)
+        t2 = b23t(p[rows] / 10.0) - 273.15 + 1e-9
+        inLiquid = f(lo[rows], rows) * f(t1, rows) <= 0
+        hi[rows[inLiquid]] = t1[inLiquid]
+        lo[rows[~inLiquid]] = t2[~inLiquid]
+    fLo, fHi = f(lo, every), f(hi, every)
+    ySat = np.where(liquid, sat[prop + 'L'], sat[prop + 'V'])
+    yEdge = np.where(liquid, fHi, fLo) + val
+    ok = (fLo * fHi <= 0) & (over | ((val - ySat) * (val - yEdge) > 0))  # nan drops out here too
+    rows = np.flatnonzero(ok)
+    a, b, fa = lo[rows], hi[rows], fLo[rows]
+    while len(rows):
+        m = 0.5 * (a + b)
+        fm = f(m, rows)
+        left = fa * fm <= 0
+        b = np.where(left, m, b)
+        a = np.where(left, a, m)
+        fa = np.where(left, fa, fm)
+        if np.all(b - a <= 1e-12 + 4e-16 * np.abs(m)):
+            break
+    if len(rows):
+        t = 0.5 * (a + b)
+        codes = regionClassifier.get(steamTable).classify(p[rows], t, tol=0.0)  # single phase already
+        _singlePhase(steamTable, out, idx[rows], p[rows], t, codes)
+    return idx[~ok], p[~ok], val[~ok]
+
+def _inverseHandler(prop1, prop2, refine=True):
+    """handler for (h, s) and (u, v) rows: one vectorized grid lookup, then a newton polish per unique row"""
+    def handler(steamTable, out, idx, v1, v2):
+        inv = StateInverse.stateInverter.get(prop1 + prop2, steamTable=steamTable)
+        vals, uinv = np.unique(np.column_stack((v1, v2)), axis=0, return_inverse=True)
+        uinv = uinv.reshape(-1)
+        p, t, x = inv.invert(vals[:, 0], vals[:, 1])
+        if np.isnan(p).any():
+            k = np.flatnonzero(np.isnan(p))[0]
+            raise ValueError(f"{prop1} = {vals[k, 0]} and {prop2} = {vals[k, 1]} is outside the range of the steam tables")
+        if refine:
+            for k in range(len(p)):
+                p[k], t[k], x[k] = inv.newton(vals[k, 0], vals[k, 1], p[k], t[k], x[k])
+        p, t, x = p[uinv], t[uinv], x[uinv]
+        twoPhase = x >= 0
+        if twoPhase.any():
+            _setStates_px(steamTable, out, idx[twoPhase], p[twoPhase], x[twoPhase])
+        single = ~twoPhase
+        if single.any():
+            codes = regionClassifier.get(steamTable).classify(p[single], t[single], tol=0.0)  # no band, x said single
+            _singlePhase(steamTable, out, idx[single], p[single], t[single], codes)
+    return handler
+
+# canonical (prop1, prop2) order -> handler, swapped pairs get flipped before lookup
+_pairHandlers = {
+    ('p', 't'): _setStates_pt,
+    ('p', 'x'): _setStates_px,
+    ('t', 'x'): _setStates_tx,
+}
+for _a in ('p', 't'):
+    for _b in ('h', 's', 'u', 'v'):
+        _pairHandlers[(_a, _b)] = _solvedHandler(_a, _b)
+_pairHandlers[('h', 's')] = _inverseHandler('h', 's')
+_pairHandlers[('u', 'v')] = _inverseHandler('u', 'v')
+
+def setStates(prop1, prop2, val1, val2, SI=True, steamTable=None, fast=None, backend=None):
+    """
+    Batch version of thermoState.setState
+    Args:
+        prop1, prop2: property codes ('p', 't', 'x', ...), either a single string or an array with one code per row
+        val1, val2: arrays of values for those properties in SI or english units
+        SI: True if SI units, False if english, defaults to True.  Same as setState, english columns get converted
+            to SI going in and the results come back out converted, the evaluation itself is always SI
+        steamTable: optional SI XSteam-like object to use, defaults to steamTables.sat(True, fast, backend)
+        fast: True to use the interpolated saturation dome, see steamTables.sat
+        backend: 'pyXSteam' or 'if97', see steamTables.sat.  if97 evaluates the (p, t), (p, x) and (t, x) columns
+            and the saturation side of the solved pairs as whole arrays, nan in region 3 and 5
+    Returns:
+        a stateBatch with one row per input, in the units asked for
+    """
+    val1 = np.atleast_1d(np.asarray(val1, dtype=float))
+    val2 = np.atleast_1d(np.asarray(val2, dtype=float))
+    if val1.shape != val2.shape or val1.ndim != 1:
+        raise ValueError("val1 and val2 must be 1-D arrays of the same length")
+    n = len(val1)
+    prop1 = np.broadcast_to(np.asarray(prop1, dtype=str), (n,))
+    prop2 = np.broadcast_to(np.asarray(prop2, dtype=str), (n,))
+    if steamTable is None:
+        steamTable = steamTables.sat(True, fast, backend)
+
+    out = stateBatch(n)
+    # group rows by property pair so each handler gets whole arrays
+    pairs, inv = np.unique(np.column_stack((prop1, prop2)), axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    for k, (a, b) in enumerate(pairs):
+        idx = np.flatnonzero(inv == k)
+        va, vb = val1[idx], val2[idx]
+        if (a, b) not in _pairHandlers and (b, a) not in _pairHandlers:
+            raise ValueError(f"Unsupported property combination: {a} and {b}")
+        if not SI:  # into SI before anything gets looked up
+            va, vb = UC.convert(va, a, 'EN', 'SI'), UC.convert(vb, b, 'EN', 'SI')
+        handler = _pairHandlers.get((a, b))
+        if handler is None:
+            handler = _pairHandlers[(b, a)]
+            va, vb = vb, va
+        handler(steamTable, out, idx, va, vb)
+    if not SI:
+        UC.convertColumns(out, 'SI', 'EN')
+    return out
@@ -0,0 +1,298 @@
+"""
+Micro-benchmarks for the thermo core: every thermoState.setState branch, thermoSatProps, UC conversions and state
+differences, each at a single-call size (same input over and over) and a bulk size (a sweep of different inputs).
+Cold start import times (each in a fresh interpreter) go in too, with the heavy packages each import drags along.
+Results go to JSON with the machine they ran on, and compare flags anything that got slower than a threshold.
+
+    python ThermoBenchmarks.py run -o before.json
+    python ThermoBenchmarks.py run -o after.json
+    python ThermoBenchmarks.py compare before.json after.json --threshold 0.10
+"""
+
+#region imports
+import os
+import sys
+import json
+import time
+import timeit
+import fnmatch
+import logging
+import platform
+import argparse
+import subprocess
+import numpy as np
+from ThermoCore import thermoState, thermoSatProps
+from ThermoBatch import setStates
+from SteamTables import steamTables
+from StateRegions import regionClassifier
+from UnitConversion import UC
+#endregion
+
+#region cases
+# each case: name -> (setup, ops) where setup() returns the function to time and ops is states/values per call
+cases = {}
+
+def case(name, ops=1):
+    """decorator adding a setup function to cases"""
+    def register(setup):
+        cases[name] = (setup, ops)
+        return setup
+    return register
+
+_branches = {'subcooled': ('p', 't', 10.0, 100.0), 'superheated': ('p', 't', 10.0, 300.0),
+             'two-phase p-t': ('p', 't', 1.0, 99.606), 'p-x': ('p', 'x', 10.0, 0.5), 'p-h': ('p', 'h', 10.0, 3000.0)}
+_bulkN = 1000
+
+def _bulkInputs(prop1, prop2, val1, val2):
+    """_bulkN inputs spread around one case, different enough that the caches don't just hand the answer back"""
+    rng = np.random.default_rng(1)
+    p = val1 * np.exp(rng.uniform(-0.5, 0.5, _bulkN))
+    if prop2 == 't' and prop1 == 'p' and val2 == 99.606:  # stay on the dome
+        return p, np.array([steamTables.get().tsat_p(pi) for pi in p])
+    if prop2 == 'x':
+        return p, rng.uniform(0.0, 1.0, _bulkN)
+    return p, np.full(_bulkN, val2)
+
+for _name, (_a, _b, _v1, _v2) in _branches.items():
+    def _single(a=_a, b=_b, v1=_v1, v2=_v2):
+        state = thermoState()
+        return lambda: state.setState(a, b, v1, v2)
+
+    def _bulk(a=_a, b=_b, v1=_v1, v2=_v2):
+        state = thermoState()
+        p, y = _bulkInputs(a, b, v1, v2)
+        def run():
+            for pi, yi in zip(p, y):
+                state.setState(a, b, pi, yi)
+        return run
+
+    def _batch(a=_a, b=_b, v1=_v1, v2=_v2):
+        p, y = _bulkInputs(a, b, v1, v2)
+        return lambda: setStates(a, b, p, y)
+
+    def _batchIF97(a=_a, b=_b, v1=_v1, v2=_v2):
+        p, y = _bulkInputs(a, b, v1, v2)
+        return lambda: setStates(a, b, p, y, backend='if97')
+
+    case(f"setState {_name}")(_single)
+    case(f"setState {_name} x{_bulkN}", _bulkN)(_bulk)
+    case(f"setStates {_name} x{_bulkN}", _bulkN)(_batch)
+    case(f"setStates if97 {_name} x{_bulkN}", _bulkN)(_batchIF97)
+
+@case("thermoSatProps p")
+def _satProps():
+    return lambda: thermoSatProps(p=10.0)
+
+@case(f"thermoSatProps p x{_bulkN}", _bulkN)
+def _satPropsBulk():
+    p = np.geomspace(0.01, 200.0, _bulkN)
+    def run():
+        for pi in p:
+            thermoSatProps(p=pi)
+    return run
+
+@case("thermoState __sub__")
+def _sub():
+    a, b = thermoState(), thermoState()
+    a.setState('p', 't', 10.0, 300.0)
+    b.setState('p', 'x', 1.0, 0.9)
+    return lambda: a - b
+
+@case("stateBatch delta x100000", 100000)
+def _delta():
+    n = 100000
+    a = setStates('p', 'x', np.full(n, 1.0), np.linspace(0, 1, n))
+    b = setStates('p', 'x', np.full(n, 5.0), np.linspace(0, 1, n))
+    out = setStates('p', 'x', np.full(n, 1.0), np.zeros(n))
+    return lambda: a.delta(b, out=out)
+
+@case(f"stateBatch derivatives x{_bulkN}", _bulkN)
+def _derivatives():
+    p, t = _bulkInputs('p', 't', 10.0, 300.0)
+    batch = setStates('p', 't', p, t)
+    return lambda: batch.derivatives()
+
+@case(f"stateBatch derivatives if97 x{_bulkN}", _bulkN)
+def _derivativesIF97():
+    p, t = _bulkInputs('p', 't', 10.0, 300.0)
+    batch = setStates('p', 't', p, t, backend='if97')
+    return lambda: batch.derivatives(backend='if97')
+
+@case("regionClassifier classify x100000", 100000)
+def _classify():
+    rng = np.random.default_rng(2)
+    p = np.exp(rng.uniform(np.log(0.01), np.log(300.0), 100000))
+    t = rng.uniform(0.0, 800.0, 100000)
+    regions = regionClassifier.get()
+    return lambda: regions.classify(p, t)
+
+@case("UC C_to_F")
+def _cToF():
+    return lambda: UC.C_to_F(100.0)
+
+@case("UC convert t")
+def _convert():
+    return lambda: UC.convert(100.0, 't', 'SI', 'EN')
+
+@case("UC convertMany 4", 4)
+def _convertMany():
+    vals = np.array([10.0, 300.0, 1.0, 0.5])
+    return lambda: UC.convertMany(vals, ['p', 't', 'h', 'x'], 'SI', 'EN')
+
+@case("UC convert t in place x100000", 100000)
+def _convertBulk():
+    vals = np.linspace(0.0, 800.0, 100000)
+    def run():
+        UC.convert(vals, 't', 'SI', 'EN', out=vals)
+        UC.convert(vals, 't', 'EN', 'SI', out=vals)
+    return run
+#endregion
+
+#region import times
+# cold start checks, each one runs in a fresh interpreter: name -> (code to time, setup code run first)
+importCases = {'import UnitConversion': ("import UnitConversion", ""),
+               'import ThermoCore': ("import ThermoCore", ""),
+               'import ThermoBatch': ("import ThermoBatch", ""),
+               'import ThermoCLI': ("import ThermoCLI", ""),
+               'import GUI': ("import Thermal_State_App_ver5", ""),
+               'first setState p-t': ("s = ThermoCore.thermoState(); s.setState('p', 't', 10.0, 300.0)",
+                                      "import ThermoCore"),
+               'first setState p-h': ("s = ThermoCore.thermoState(); s.setState('p', 'h', 10.0, 3000.0)",
+                                      "import ThermoCore")}
+_heavy = ('scipy', 'pyXSteam', 'PyQt5', 'matplotlib')
+
+def importBenchmarks(pattern='*', repeat=5):
+    """
+    Times the importCases in fresh interpreters (interpreter startup itself isn't counted)
+    :return: dict of name -> {'ops', 'loops', 'best', 'median', 'loaded'} with loaded the heavy packages it pulled in
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, (code, setup) in importCases.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        script = (f"import sys, time\n{setup}\nstart = time.perf_counter()\n{code}\n"
+                  f"seconds = time.perf_counter() - start\n"
+                  f"print(seconds, ','.join(k for k in {_heavy!r} if k in sys.modules))")
+        times = []
+        for i in range(repeat):
+            run = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=here,
+                                 env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen')))
+            if run.returncode:
+                break  # e.g. no PyQt5 here, leave it out
+            seconds, _, loaded = run.stdout.strip().splitlines()[-1].partition(' ')
+            times.append(float(seconds))
+        if times:
+            results[name] = {'ops': 1, 'loops': 1, 'best': min(times), 'median': float(np.median(times)),
+                             'loaded': loaded}
+    return results
+#endregion
+
+def machineInfo():
+    """what the numbers were measured on"""
+    info = {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'machine': platform.machine(), 'processor': platform.processor(),
+            'cpus': os.cpu_count(), 'numpy': np.__version__,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+    try:
+        import pyXSteam
+        info['pyXSteam'] = getattr(pyXSteam, '__version__', 'unknown')
+    except ImportError:
+        pass
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        pass
+    return info
+
+def runBenchmarks(pattern='*', repeat=5, minTime=0.2):
+    """
+    Times every case whose name matches pattern
+    :param repeat: timing rounds per case, the best and the median are kept
+    :param minTime: seconds each round should take at least (sets the loop count)
+    :return: dict of name -> {'ops', 'loops', 'best', 'median'} with times in seconds per op
+    """
+    results = {}
+    for name, (setup, ops) in cases.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        func = setup()
+        timer = timeit.Timer(func)
+        func()  # warm up (caches, grids), the first call isn't what we're after
+        loops = 1
+        while timer.timeit(loops) < minTime:
+            loops *= 2
+        times = np.array(timer.repeat(repeat, loops)) / (loops * ops)
+        results[name] = {'ops': ops, 'loops': loops, 'best': float(times.min()), 'median': float(np.median(times))}
+    return results
+
+def compare(old, new, threshold=0.10, key='best'):
+    """
+    Compares two result files' results
+    :param threshold: relative slowdown that counts as a regression, 0.10 is 10 % slower
+    :return: list of (name, old s/op, new s/op, ratio, flag) with flag 'REGRESSION', 'faster' or ''
+    """
+    rows = []
+    for name in sorted(set(old) | set(new)):
+        if name not in old or name not in new:
+            rows.append((name, old.get(name, {}).get(key), new.get(name, {}).get(key), None,
+                         'new' if name in new else 'gone'))
+            continue
+        ratio = new[name][key] / old[name][key]
+        flag = 'REGRESSION' if ratio > 1 + threshold else 'faster' if ratio < 1 / (1 + threshold) else ''
+        rows.append((name, old[name][key], new[name][key], ratio, flag))
+    return rows
+
+def _fmt(seconds):
+    """seconds per op in a readable unit"""
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+def main(argv=None):
+    """command line entry point"""
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the thermo core")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="run the benchmarks")
+    run.add_argument('-o', '--output', help="JSON file to save the results to")
+    run.add_argument('-k', '--filter', default='*', help="only run cases matching this pattern, like 'UC*'")
+    run.add_argument('--repeat', type=int, default=5, help="timing rounds per case")
+    run.add_argument('--min-time', type=float, default=0.2, help="seconds per round at least")
+    run.add_argument('--no-imports', action='store_true', help="skip the cold start import timings")
+    cmp = sub.add_parser('compare', help="compare two result files")
+    cmp.add_argument('old')
+    cmp.add_argument('new')
+    cmp.add_argument('--threshold', type=float, default=0.10, help="relative slowdown to flag, 0.10 = 10 %%")
+    cmp.add_argument('--key', default='best', choices=['best', 'median'])
+    args = parser.parse_args(argv)
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+
+    if args.command == 'run':
+        results = runBenchmarks(args.filter, args.repeat, args.min_time)
+        if not args.no_imports:
+            results.update(importBenchmarks(args.filter, args.repeat))
+        for name, r in results.items():
+            loaded = f"  loads {r['loaded']}" if r.get('loaded') else ''
+            print(f"{name:<40}{_fmt(r['best']):>14}{_fmt(r['median']):>14} per op{loaded}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'machine': machineInfo(), 'results': results}, f, indent=2)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old['machine'].get('platform') != new['machine'].get('platform'):
+        print("warning: results are from different machines", file=sys.stderr)
+    rows = compare(old['results'], new['results'], args.threshold, args.key)
+    for name, a, b, ratio, flag in rows:
+        print(f"{name:<40}{_fmt(a):>14}{_fmt(b):>14}{'' if ratio is None else f'{ratio:8.2f}x':>10}  {flag}")
+    return 1 if any(r[4] == 'REGRESSION' for r in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Headless batch calculator, no GUI (and no PyQt5) involved.
+Reads state specs as CSV rows of prop1, val1, prop2, val2[, units] from a file or stdin, runs each one through
+thermoState.setState and writes the result row right away, so memory stays flat no matter how long the input is.
+units is SI or EN (english), rows without it use --units.  Blank rows and rows starting with # are skipped, and so
+is the first row after them if its val1 isn't a number (a header).  Rows that can't be evaluated, pyXSteam's nan for
+anything out of range included, get the error message in the error column instead of stopping the run.
+
+    python ThermoCLI.py states.csv -o results.csv
+    cat states.csv | python ThermoCLI.py --units EN
+    python ThermoCLI.py states.csv --cache states.sqlite  # reuse results from earlier runs
+"""
+
+#region imports
+import sys
+import csv
+import math
+import time
+import argparse
+import logging
+from ThermoCore import thermoState
+from StateStore import stateStore
+#endregion
+
+outputColumns = ['prop1', 'val1', 'prop2', 'val2', 'units', 'region', 'p', 't', 'u', 'h', 's', 'v', 'x', 'error']
+
+def readSpecs(stream):
+    """
+    Generator over the state specs in a CSV stream, one row at a time
+    :param stream: file-like object with prop1, val1, prop2, val2[, units] rows
+    :return: yields (prop1, val1, prop2, val2, units or None) with the values still as text
+    """
+    first = True
+    for row in csv.reader(stream):
+        row = [c.strip() for c in row]
+        if not row or not any(row) or row[0].startswith('#'):
+            continue
+        if first:  # the header, if there is one, is the first row that isn't blank or a comment
+            first = False
+            try:
+                float(row[1])
+            except (ValueError, IndexError):
+                continue
+        row += [''] * (5 - len(row))
+        yield row[0], row[1], row[2], row[3], row[4] or None
+
+def evaluate(spec, defaultUnits='SI', fast=None, store=None):
+    """
+    Runs one spec through thermoState, through the stateStore first if there is one
+    :return: a dict keyed by outputColumns, error holds the message if setState failed
+    """
+    prop1, val1, prop2, val2, units = spec
+    units = (units or defaultUnits).upper()
+    result = dict.fromkeys(outputColumns, '')
+    result.update(prop1=prop1, val1=val1, prop2=prop2, val2=val2, units=units)
+    try:
+        if units not in ('SI', 'EN'):
+            raise ValueError(f"Unknown units {units}, use SI or EN")
+        state = thermoState(fast=fast, store=store)
+        state.setState(prop1.lower(), prop2.lower(), float(val1), float(val2), SI=units == 'SI')
+        if not all(math.isfinite(getattr(state, name)) for name in ('p', 't', 'u', 'h', 's', 'v')):
+            raise ValueError(f"{prop1} = {val1} and {prop2} = {val2} is outside the range of the steam tables")
+    except Exception as e:  # keep going, the row just carries the error
+        result['error'] = str(e)
+        return result
+    result['region'] = state.region
+    for name in ('p', 't', 'u', 'h', 's', 'v', 'x'):
+        result[name] = repr(float(getattr(state, name)))
+    return result
+
+def run(inStream, outStream, defaultUnits='SI', fast=None, flushEvery=1000, store=None):
+    """
+    Streams specs from inStream to results on outStream
+    :return: (rows written, rows with errors, seconds)
+    """
+    writer = csv.DictWriter(outStream, fieldnames=outputColumns, lineterminator='\n')
+    writer.writeheader()
+    rows = errors = 0
+    start = time.perf_counter()
+    for spec in readSpecs(inStream):
+        result = evaluate(spec, defaultUnits, fast, store)
+        writer.writerow(result)
+        rows += 1
+        errors += bool(result['error'])
+        if rows % flushEvery == 0:
+            outStream.flush()
+    outStream.flush()
+    return rows, errors, time.perf_counter() - start
+
+def main(argv=None):
+    """command line entry point"""
+    parser = argparse.ArgumentParser(description="Thermodynamic state calculator for steam, batch mode")
+    parser.add_argument('input', nargs='?', default='-', help="CSV of prop1,val1,prop2,val2[,units] rows, - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="where to write the results CSV, - for stdout")
+    parser.add_argument('--units', default='SI', choices=['SI', 'EN'], help="units for rows that don't say")
+    parser.add_argument('--fast', action='store_true', help="use the interpolated saturation table")
+    parser.add_argument('--cache', metavar='FILE', help="SQLite file of results kept between runs")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show pyXSteam's range warnings")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.getLogger('pyXSteam').setLevel(logging.ERROR)  # out of range rows already land in the error column
+
+    inStream = sys.stdin if args.input == '-' else open(args.input, newline='')
+    outStream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    store = stateStore(args.cache) if args.cache else None
+    try:
+        rows, errors, seconds = run(inStream, outStream, args.units, True if args.fast else None, store=store)
+    finally:
+        if store is not None:
+            store.close()
+            print(store.report(), file=sys.stderr)
+        if inStream is not sys.stdin:
+            inStream.close()
+        if outStream is not sys.stdout:
+            outStream.close()
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"{rows} rows ({errors} errors) in {seconds:.2f} s, {rate:.1f} rows/s", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
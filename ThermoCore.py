@@ -0,0 +1,246 @@
+#region imports
+import math
+from SteamTables import steamTables
+import StateSolvers
+import StateInverse
+import ThermoTrace
+from StateRegions import regionClassifier
+from UnitConversion import UC
+#endregion
+
+#region lazy evaluation stats
+# per property: 'deferred' states that didn't compute it up front, 'computed' how many of those got read later,
+# 'calls' library calls the lazy reads made, 'eagerCalls' what computing them all up front would have cost
+lazyStats = {}
+
+def resetLazyStats():
+    """clears the lazy evaluation counters"""
+    lazyStats.clear()
+
+def _lazyEntry(prop):
+    return lazyStats.setdefault(prop, {'deferred': 0, 'computed': 0, 'calls': 0, 'eagerCalls': 0})
+
+def lazyReport():
+    """
+    How much the lazy states saved so far
+    :return: string table with deferred, computed, library calls made and library calls avoided per property
+    """
+    lines = ["{:<6}{:>10}{:>10}{:>8}{:>10}".format("prop", "deferred", "computed", "calls", "avoided")]
+    for prop in sorted(lazyStats):
+        e = lazyStats[prop]
+        lines.append("{:<6}{:>10d}{:>10d}{:>8d}{:>10d}".format(prop, e['deferred'], e['computed'], e['calls'],
+                                                               e['eagerCalls'] - e['calls']))
+    return "\n".join(lines)
+#endregion
+
+#region unit boundary
+# everything in here and below (tables, caches, solvers, grids) runs in SI, english only exists at the edges
+def _toSI(prop, val, SI):
+    """an input value in SI, props UC doesn't know pass through and get turned down by setState"""
+    return val if SI or (prop, 'EN', 'SI') not in UC.conversions else UC.convert(val, prop, 'EN', 'SI')
+#endregion
+
+# Sample thermoState class implementation (replace with your actual implementation if different)
+class thermoState:
+    """this class handles all the thermodynamic state stuff, pretty cool huh"""
+    lazyProps = ('v', 'u', 'h', 's')  # the ones lazy mode waits on, p, t, x and region always get set
+
+    def __init__(self, fast=None, lazy=False, store=None, backend=None):
+        """
+        Args:
+            fast: True to read saturation props from the interpolated satTable (~1e-5 relative error),
+                False for exact pyXSteam values, None follows steamTables.fastSat
+            backend: 'pyXSteam' or 'if97' (NumPy IF97 regions 1, 2 and 4, nan in region 3 and 5),
+                None follows steamTables.backend
+            lazy: True to only work out v, u, h and s when they're first read (for the p-t and p-x pairs,
+                the solved pairs get everything from the solve anyway), see lazyReport for what it saved
+            store: optional StateStore.stateStore, states found in it skip pyXSteam and new ones get saved to it
+                (exact ones only, fast states read from it but don't write)
+        """
+        self.fast = fast
+        self.backend = backend
+        self.lazy = lazy
+        self.store = store
+        self._pending = None  # 'two-phase' or 'single' while some lazy props haven't been read yet
+        self._sat = {}  # saturated values looked up so far for the lazy props, shared between them
+        self.steamTable = None  # the shared SI table, nothing gets built until setState needs it
+        self.SI = True  # units the props are in, setState converts english at the edges
+        self.region = "unknown"  # startin with unknown region, we’ll figure it out later
+        self.p = 0.0  # Pressure
+        self.t = 0.0  # Temperature
+        self.u = 0.0  # Internal Energy
+        self.h = 0.0  # Enthalpy
+        self.s = 0.0  # Entropy
+        self.v = 0.0  # Specific Volume
+        self.x = -1.0  # Quality (-1 for superheated, 0-1 for two-phase)
+        self.ambiguous = False  # True if a T-h/T-u/T-s input could also be compressed liquid, read as two-phase
+
+    def setState(self, prop1, prop2, val1, val2, SI=True):
+        """
+        Sets the thermodinamic state based on two properties, its a bit tricky but works good
+        Args:
+            prop1, prop2: stuff like 'p', 't', 'v', 'u', 'h', 's', 'x', one of them has to be 'p' or 't',
+                except for the (h, s) and (u, v) pairs which go through the StateInverse grids
+            val1, val2: the values for those properties in SI or english units
+            SI: True if SI units, False if english, defaults to True.  English values get converted to SI on the
+                way in and the results back on the way out, the state itself is always worked out in SI
+        """
+        self.SI = True
+        self.ambiguous = False
+        si1, si2 = _toSI(prop1, val1, SI), _toSI(prop2, val2, SI)
+        if self.store is not None:
+            cached = self.store.get(prop1, prop2, si1, si2)
+            if cached is not None:  # worked out before, no library calls at all
+                self._pending = None
+                self.__dict__.update(cached)
+            else:
+                self._setState(prop1, prop2, si1, si2)
+                # the backends agree to ~1e-11 so they share rows, except if97's nan outside regions 1, 2 and 4.
+                # Interpolated (fast) states don't get saved, the rows are handed to exact callers too, and neither do
+                # ambiguous ones, a row has nowhere to keep the flag
+                exact = not (steamTables.fastSat if self.fast is None else self.fast) and not self.ambiguous
+                if exact and (math.isfinite(self.h) or (self.backend or steamTables.backend) != 'if97'):
+                    self.store.put(prop1, prop2, si1, si2, self)  # reads every prop, so lazy mode ends up eager here
+        else:
+            self._setState(prop1, prop2, si1, si2)
+        if not SI:
+            self._toEnglish()
+            setattr(self, prop1, val1)  # the inputs stay exactly what was given, no round trip wobble
+            setattr(self, prop2, val2)
+
+    def _toEnglish(self):
+        """converts the props that are set so far to english, lazy ones get converted when they're read"""
+        self.SI = False
+        for prop in ('p', 't', 'u', 'h', 's', 'v'):
+            if prop in self.__dict__:
+                self.__dict__[prop] = UC.convert(self.__dict__[prop], prop, 'SI', 'EN')
+
+    def _setState(self, prop1, prop2, val1, val2):
+        """setState without the store or the units, values in SI"""
+        self.steamTable = ThermoTrace.countCalls(steamTables.sat(True, self.fast, self.backend))  # shared SI table, memoized or interpolated, calls counted when tracing
+        self._pending = None
+        self._sat = {}
+
+        # put p first, then t, so ('t','p') or ('h','p') land on the same branch as ('p','t') and ('p','h')
+        if prop2 == 'p' or (prop2 == 't' and prop1 != 'p'):
+            prop1, prop2, val1, val2 = prop2, prop1, val2, val1
+
+        # figure out the state based on what we got
+        if prop1 == 'p' and prop2 == 't':
+            self.p = val1
+            self.t = val2
+            # one tsat lookup decides it, within regionClassifier.twoPhaseTol of it is two-phase land
+            region = regionClassifier.get(self.steamTable).regionOf(self.p, self.t)
+            if region == "two-phase":
+                self.region = "two-phase"  # yay two-phase region
+                self.x = 0.5  # just guessin 0.5 for testing, like the orig code
+                if self.lazy:
+                    return self._defer("two-phase")
+                self.v = self.steamTable.vL_p(self.p) + self.x * (self.steamTable.vV_p(self.p) - self.steamTable.vL_p(self.p))
+                self.u = self.steamTable.uL_p(self.p) + self.x * (self.steamTable.uV_p(self.p) - self.steamTable.uL_p(self.p))
+                self.h = self.steamTable.hL_p(self.p) + self.x * (self.steamTable.hV_p(self.p) - self.steamTable.hL_p(self.p))
+                self.s = self.steamTable.sL_p(self.p) + self.x * (self.steamTable.sV_p(self.p) - self.steamTable.sL_p(self.p))
+            else:
+                self.region = region  # hot, cold or past the critical point
+                self.x = -1.0  # no quality here
+                if self.lazy:
+                    return self._defer("single")
+                self.v = self.steamTable.v_pt(self.p, self.t)
+                self.u = self.steamTable.u_pt(self.p, self.t)
+                self.h = self.steamTable.h_pt(self.p, self.t)
+                self.s = self.steamTable.s_pt(self.p, self.t)
+        elif prop1 == 'p' and prop2 == 'x':
+            self.p = val1
+            self.x = val2
+            self.region = "two-phase"  # def two-phase with quality
+            self.t = self.steamTable.tsat_p(self.p)
+            if self.lazy:
+                return self._defer("two-phase")
+            self.v = self.steamTable.vL_p(self.p) + self.x * (self.steamTable.vV_p(self.p) - self.steamTable.vL_p(self.p))
+            self.u = self.steamTable.uL_p(self.p) + self.x * (self.steamTable.uV_p(self.p) - self.steamTable.uL_p(self.p))
+            self.h = self.steamTable.hL_p(self.p) + self.x * (self.steamTable.hV_p(self.p) - self.steamTable.hL_p(self.p))
+            self.s = self.steamTable.sL_p(self.p) + self.x * (self.steamTable.sV_p(self.p) - self.steamTable.sL_p(self.p))
+        elif prop1 in ('p', 't') and prop2 in ('x', 'h', 's', 'u', 'v'):
+            # everything else with p or t in it is a 1-D solve for the other one of the two
+            state = StateSolvers.solveState(self.steamTable, prop1, val1, prop2, val2)
+            for name, val in state.items():
+                setattr(self, name, val)
+        elif {prop1, prop2} in ({'h', 's'}, {'u', 'v'}):
+            # no p or t at all, look the pair up in the precomputed grid and polish with newton
+            state = StateInverse.solveState(self.steamTable, prop1, val1, prop2, val2)
+            for name, val in state.items():
+                setattr(self, name, val)
+        else:
+            raise ValueError(f"Unsupported property combination: {prop1} and {prop2}")  # oops, cant do that combo
+
+    def _defer(self, kind):
+        """drops v, u, h and s so the next read of each one goes through __getattr__ and gets computed then"""
+        self._pending = kind
+        self._at = (self.p, self.t)  # SI p and t for the later reads, self.p and self.t might go english after this
+        eagerCost = 3 if kind == "two-phase" else 1  # the eager two-phase lines call the library 3 times per prop
+        for prop in self.lazyProps:
+            self.__dict__.pop(prop, None)
+            entry = _lazyEntry(prop)
+            entry['deferred'] += 1
+            entry['eagerCalls'] += eagerCost
+
+    def _satValue(self, name, prop):
+        """saturated value like 'hL' at self.p, looked up once per state and shared by the lazy props"""
+        if name not in self._sat:
+            self._sat[name] = getattr(self.steamTable, name + '_p')(self._at[0])
+            _lazyEntry(prop)['calls'] += 1
+        return self._sat[name]
+
+    def __getattr__(self, name):
+        # only gets here for attributes that aren't set, i.e. a lazy prop that hasn't been read yet
+        if name not in thermoState.lazyProps or self.__dict__.get('_pending') is None:
+            raise AttributeError(f"'thermoState' object has no attribute '{name}'")
+        entry = _lazyEntry(name)
+        if self._pending == "two-phase":
+            yL = self._satValue(name + 'L', name)
+            val = yL + self.x * (self._satValue(name + 'V', name) - yL)
+        else:
+            val = getattr(self.steamTable, name + '_pt')(*self._at)
+            entry['calls'] += 1
+        if not self.SI:
+            val = UC.convert(val, name, 'SI', 'EN')
+        entry['computed'] += 1
+        setattr(self, name, val)  # cached, later reads don't come back here
+        if all(prop in self.__dict__ for prop in self.lazyProps):
+            self._pending = None
+        return val
+
+    def derivatives(self):
+        """
+        cp, cv, (dv/dT)_p, (dv/dp)_T and (dh/dp)_T at this state, in its units (see StateDerivatives)
+        :return: dict with cp, cv, dvdT, dvdp and dhdp, all nan for two-phase states
+        """
+        import StateDerivatives  # pulls in ThermoBatch, which imports this module
+        return StateDerivatives.derivatives(self.p, self.t, self.region, self.h, self.v, self.SI, fast=self.fast,
+                                            backend=self.backend)
+
+    def __sub__(self, other):
+        """subtracts one state from another, handy for diffs"""
+        result = thermoState()
+        result.SI = self.SI
+        result.p = self.p - other.p
+        result.t = self.t - other.t
+        result.u = self.u - other.u
+        result.h = self.h - other.h
+        result.s = self.s - other.s
+        result.v = self.v - other.v
+        return result  # heres your difference
+
+# Sample thermoSatProps class (minimal implementation for completeness)
+class thermoSatProps:
+    """quick class for saturation props, just the basics"""
+    def __init__(self, p=None, t=None, fast=None, backend=None):
+        self.steamTable = steamTables.sat(fast=fast, backend=backend)  # fast=True reads the interpolated satTable, backend='if97' the NumPy IF97 one
+        if p is not None:
+            self.p = p
+            self.t = self.steamTable.tsat_p(p)  # get temp from pressure
+        elif t is not None:
+            self.t = t
+            self.p = self.steamTable.psat_t(t)  # get pressure from temp
+        else:
+            raise ValueError("Must specify either pressure or temperature")  # gotta give me somethin
@@ -0,0 +1,147 @@
+"""
+Process pool engine for big state sweeps.
+pyXSteam is pure python, so one process tops out at one core.  parallelStates cuts the input arrays into chunks,
+farms the chunks out to worker processes (each with its own steam tables, built once when the worker starts) and
+puts the results back together in input order.  A row that setState can't handle gets its message in errors[i]
+and nan properties, the rest of the batch carries on.
+
+    python ThermoParallel.py  # runs the scaling benchmark
+"""
+
+#region imports
+import os
+import sys
+import time
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ThermoCore import thermoState
+from ThermoBatch import stateBatch, REGIONS
+from SteamTables import steamTables
+from StateStore import stateStore
+#endregion
+
+lastCacheStats = {}  # hits, misses and writes summed over the workers for the last parallelStates call with a cache
+_store = None  # this process's stateStore when running with a cache
+
+def _initWorker(SI, fast, cache=None):
+    """
+    runs once in each worker process, builds that process's tables up front, opens its own connection to the
+    cache file if there is one and quiets pyXSteam's warnings
+    """
+    global _store
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+    steamTables.sat(True, fast)  # english rows get converted and run on the SI table too
+    if cache is not None and (_store is None or _store.path != cache):
+        _store = stateStore(cache)
+
+def _evalChunk(args):
+    """
+    Evaluates one chunk row by row with thermoState.setState
+    :param args: (prop1, prop2, val1, val2, SI, fast, cache) for the chunk
+    :return: (dict of property arrays, region codes, list of error messages with '' for good rows,
+              dict of cache hits, misses and writes for the chunk)
+    """
+    prop1, prop2, val1, val2, SI, fast, cache = args
+    if cache is not None:
+        _initWorker(SI, fast, cache)  # no-op in a worker, opens the store when running in this process
+    store = _store if cache is not None else None
+    before = (store.hits, store.misses, store.writes) if store else (0, 0, 0)
+    n = len(val1)
+    cols = {name: np.full(n, np.nan) for name in ('p', 't', 'u', 'h', 's', 'v', 'x')}
+    region = np.zeros(n, dtype=np.int8)
+    errors = [''] * n
+    state = thermoState(fast=fast, store=store)
+    for i in range(n):
+        try:
+            state.setState(prop1[i], prop2[i], float(val1[i]), float(val2[i]), SI)
+        except Exception as e:  # keep the row, record why
+            errors[i] = str(e) or type(e).__name__
+            continue
+        for name, col in cols.items():
+            col[i] = getattr(state, name)
+        region[i] = REGIONS.index(state.region)
+    cacheStats = {}
+    if store:
+        store.flush()  # so the other workers (and the next run) can see this chunk's rows
+        cacheStats = dict(zip(('hits', 'misses', 'writes'),
+                              np.subtract((store.hits, store.misses, store.writes), before).tolist()))
+    return cols, region, errors, cacheStats
+
+def parallelStates(prop1, prop2, val1, val2, SI=True, workers=None, chunkSize=2000, fast=None, cache=None):
+    """
+    Parallel version of thermoState.setState over arrays
+    Args:
+        prop1, prop2: property codes, a single string or one per row
+        val1, val2: 1-D arrays of values
+        SI: True for SI units, False for english
+        workers: number of processes, defaults to os.cpu_count(), 1 runs everything in this process
+        chunkSize: rows per task sent to a worker
+        fast: True to use the interpolated saturation table in the workers
+        cache: path of a StateStore file, each worker opens its own connection to it, totals end up in lastCacheStats
+    Returns:
+        (stateBatch with one row per input, list of error messages with '' for rows that worked)
+    """
+    val1 = np.atleast_1d(np.asarray(val1, dtype=float))
+    val2 = np.atleast_1d(np.asarray(val2, dtype=float))
+    if val1.shape != val2.shape or val1.ndim != 1:
+        raise ValueError("val1 and val2 must be 1-D arrays of the same length")
+    n = len(val1)
+    prop1 = np.broadcast_to(np.asarray(prop1, dtype=str), (n,))
+    prop2 = np.broadcast_to(np.asarray(prop2, dtype=str), (n,))
+    workers = workers or os.cpu_count() or 1
+    starts = range(0, n, chunkSize)
+    tasks = [(prop1[i:i + chunkSize], prop2[i:i + chunkSize], val1[i:i + chunkSize], val2[i:i + chunkSize], SI, fast,
+              cache) for i in starts]
+
+    if workers == 1:
+        results = map(_evalChunk, tasks)
+        out, errors = _assemble(n, starts, results)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(SI, fast, cache)) as pool:
+            out, errors = _assemble(n, starts, pool.map(_evalChunk, tasks))  # map keeps the input order
+    return out, errors
+
+def _assemble(n, starts, results):
+    """stitches the chunk results back into one stateBatch in input order"""
+    out = stateBatch(n)
+    errors = [''] * n
+    lastCacheStats.clear()
+    for start, (cols, region, errs, cacheStats) in zip(starts, results):
+        for name, count in cacheStats.items():
+            lastCacheStats[name] = lastCacheStats.get(name, 0) + count
+        stop = start + len(errs)
+        for name, col in cols.items():
+            getattr(out, name)[start:stop] = col
+        out.region[start:stop] = region
+        errors[start:stop] = errs
+    return out, errors
+
+def scalingBenchmark(n=40000, maxWorkers=None, chunkSize=2000):
+    """
+    Times parallelStates on a random (p, T) and (p, h) sweep with 1 to maxWorkers processes
+    :return: list of (workers, seconds, rows/s, speedup over 1 worker)
+    """
+    rng = np.random.default_rng(0)
+    p = np.exp(rng.uniform(np.log(0.05), np.log(200.0), n))
+    half = n // 2
+    prop2 = np.array(['t'] * half + ['h'] * (n - half))
+    val2 = np.concatenate((rng.uniform(20.0, 600.0, half), rng.uniform(200.0, 3500.0, n - half)))
+    maxWorkers = maxWorkers or os.cpu_count() or 1
+    counts = sorted({1, *[w for w in (2, 4, 8, 16, 32, 64) if w < maxWorkers], maxWorkers})
+    rows = []
+    base = None
+    for w in counts:
+        start = time.perf_counter()
+        parallelStates('p', prop2, p, val2, workers=w, chunkSize=chunkSize)
+        seconds = time.perf_counter() - start
+        base = base or seconds
+        rows.append((w, seconds, n / seconds, base / seconds))
+    return rows
+
+if __name__ == "__main__":
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    print("{:>8}{:>10}{:>12}{:>10}".format("workers", "seconds", "rows/s", "speedup"))
+    for w, seconds, rate, speedup in scalingBenchmark(n):
+        print("{:>8d}{:>10.2f}{:>12.0f}{:>10.2f}".format(w, seconds, rate, speedup))
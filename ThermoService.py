@@ -0,0 +1,335 @@
+"""
+Small HTTP/JSON service for steam properties, plain asyncio so there's nothing extra to install.
+    POST /state     {"prop1": "p", "prop2": "t", "val1": 10, "val2": 300, "units": "SI"}
+    POST /states    {"states": [{...}, {...}]}  or columns: {"prop1": "p", "prop2": "t", "val1": [...], "val2": [...]}
+    GET  /metrics   request and state counts, batch sizes, latency percentiles and throughput
+    GET  /health
+Every state that comes in waits up to --window seconds in a stateBatcher, so lots of small requests arriving
+together get evaluated as one ThermoBatch.setStates call.  That call runs in a worker pool (processes by
+default), so the event loop only ever parses, queues and answers.
+
+    python ThermoService.py --port 8765
+    python ThermoService.py --bench 2000  # starts on a free localhost port and fires concurrent requests at it
+"""
+
+#region imports
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+#endregion
+
+stateFields = ('region', 'p', 't', 'u', 'h', 's', 'v', 'x')
+
+#region evaluation (runs in the worker pool)
+def _initWorker():
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+
+def evaluateGroup(SI, prop1, prop2, val1, val2):
+    """
+    Evaluates a batch of specs in one unit system
+    :return: list with a dict of stateFields per spec, or {'error': message} for specs that couldn't be evaluated
+    """
+    from ThermoBatch import setStates
+    from ThermoCore import thermoState
+    try:
+        batch = setStates(np.array(prop1), np.array(prop2), np.array(val1, dtype=float), np.array(val2, dtype=float),
+                          SI=SI)
+    except Exception:
+        batch = None  # something in there is bad, go one by one so only that spec gets the error
+    results = []
+    for i in range(len(val1)):
+        if batch is not None and np.isfinite(batch.h[i]):
+            row = batch[i]
+            results.append({name: getattr(row, name) for name in stateFields})
+            continue
+        try:
+            state = thermoState()
+            state.setState(prop1[i], prop2[i], float(val1[i]), float(val2[i]), SI)
+            if not np.isfinite(state.h):
+                raise ValueError("state is outside the range of the steam tables")
+            results.append({name: getattr(state, name) for name in stateFields})
+        except Exception as e:
+            results.append({'error': str(e) or type(e).__name__})
+    return results
+#endregion
+
+class stateBatcher:
+    """
+    Collects specs from concurrent requests and evaluates them together.  The first spec in an empty queue starts
+    the window, the batch goes out when the window closes or when maxBatch specs are waiting, whichever is first
+    """
+    def __init__(self, pool, window=0.005, maxBatch=2048):
+        """
+        :param pool: concurrent.futures executor the evaluations run in
+        :param window: seconds to wait for more specs before evaluating
+        :param maxBatch: evaluate right away once this many specs are waiting
+        """
+        self.pool = pool
+        self.window = window
+        self.maxBatch = maxBatch
+        self._queue = []  # (spec, future)
+        self._timer = None
+        self.batches = 0
+        self.batchedStates = 0
+
+    def submit(self, spec):
+        """queues one spec, returns a future with its result dict"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((spec, future))
+        if len(self._queue) >= self.maxBatch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queue, self._queue = self._queue, []
+        if queue:
+            asyncio.get_running_loop().create_task(self._evaluate(queue))
+
+    async def _evaluate(self, queue):
+        self.batches += 1
+        self.batchedStates += len(queue)
+        loop = asyncio.get_running_loop()
+        groups = {}  # SI -> list of (spec, future), one setStates call per unit system
+        for spec, future in queue:
+            groups.setdefault(spec['SI'], []).append((spec, future))
+        for SI, items in groups.items():
+            cols = [[spec[k] for spec, f in items] for k in ('prop1', 'prop2', 'val1', 'val2')]
+            try:
+                results = await loop.run_in_executor(self.pool, evaluateGroup, SI, *cols)
+            except Exception as e:  # the pool itself fell over
+                results = [{'error': f"evaluation failed: {e}"}] * len(items)
+            for (spec, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+class serviceMetrics:
+    """request counts and latencies for /metrics"""
+    def __init__(self, keep=10000):
+        self.start = time.time()
+        self.requests = 0
+        self.states = 0
+        self.errors = 0
+        self._latency = deque(maxlen=keep)  # seconds, most recent requests
+        self._done = deque(maxlen=keep)  # (finish time, states) for the recent throughput
+
+    def record(self, seconds, states, errors):
+        self.requests += 1
+        self.states += states
+        self.errors += errors
+        self._latency.append(seconds)
+        self._done.append((time.time(), states))
+
+    def snapshot(self, batcher):
+        now = time.time()
+        lat = np.array(self._latency) * 1000.0
+        recent = [n for t, n in self._done if now - t < 10.0]
+        uptime = now - self.start
+        out = {'uptime_s': round(uptime, 3), 'requests': self.requests, 'states': self.states, 'errors': self.errors,
+               'batches': batcher.batches,
+               'mean_batch': batcher.batchedStates / batcher.batches if batcher.batches else 0.0,
+               'states_per_s': self.states / uptime if uptime > 0 else 0.0,
+               'states_per_s_10s': sum(recent) / min(10.0, uptime) if uptime > 0 else 0.0}
+        if len(lat):
+            out.update({f'latency_ms_{name}': float(np.percentile(lat, q))
+                        for name, q in (('p50', 50), ('p95', 95), ('p99', 99))})
+            out['latency_ms_max'] = float(lat.max())
+        return out
+
+class thermoService:
+    """the HTTP side: parses requests, hands the specs to the batcher and writes the JSON answers"""
+    def __init__(self, window=0.005, maxBatch=2048, workers=None, threads=False):
+        """
+        :param window: batching window in seconds, see stateBatcher
+        :param maxBatch: max specs per evaluation
+        :param workers: pool size, defaults to the number of CPUs
+        :param threads: True for a thread pool instead of processes (cheaper to start, shares the GIL)
+        """
+        workers = workers or os.cpu_count() or 1
+        self.pool = (ThreadPoolExecutor(workers, initializer=_initWorker) if threads
+                     else ProcessPoolExecutor(workers, initializer=_initWorker))
+        self.batcher = stateBatcher(self.pool, window, maxBatch)
+        self.metrics = serviceMetrics()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """starts listening, port 0 picks a free one (see self.port)"""
+        self.server = await asyncio.start_server(self._connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def parseSpec(item, defaultUnits='SI'):
+        """checks one spec dict and turns it into what the batcher wants"""
+        if not isinstance(item, dict):
+            raise ValueError(f"a state spec must be a JSON object, not {type(item).__name__}")
+        units = str(item.get('units', defaultUnits)).upper()
+        if units not in ('SI', 'EN'):
+            raise ValueError(f"Unknown units {units}, use SI or EN")
+        return {'prop1': str(item['prop1']).lower(), 'prop2': str(item['prop2']).lower(),
+                'val1': float(item['val1']), 'val2': float(item['val2']), 'SI': units == 'SI'}
+
+    def parseBatch(self, body):
+        """specs from a /states body, either a list of spec dicts or columns"""
+        if 'states' in body:
+            return [self.parseSpec(item, body.get('units', 'SI')) for item in body['states']]
+        n = len(body['val1'])
+        if len(body['val2']) != n:
+            raise ValueError("val1 and val2 must be the same length")
+        column = lambda key: body[key] if isinstance(body[key], list) else [body[key]] * n
+        prop1, prop2 = column('prop1'), column('prop2')
+        return [self.parseSpec({'prop1': prop1[i], 'prop2': prop2[i], 'val1': body['val1'][i],
+                                'val2': body['val2'][i]}, body.get('units', 'SI')) for i in range(n)]
+
+    async def handle(self, method, path, body):
+        """
+        Routes one request
+        :return: (HTTP status, JSON-able answer)
+        """
+        start = time.perf_counter()
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics.snapshot(self.batcher)
+        if method != 'POST' or path not in ('/state', '/states'):
+            return 404, {'error': f"no route for {method} {path}"}
+        try:
+            body = json.loads(body or b'{}')
+            if not isinstance(body, dict):  # valid JSON but a list or a number, nothing to route
+                raise ValueError(f"body must be a JSON object, not {type(body).__name__}")
+            specs = [self.parseSpec(body)] if path == '/state' else self.parseBatch(body)
+        except (ValueError, KeyError, TypeError) as e:
+            self.metrics.errors += 1
+            return 400, {'error': f"bad request: {e}"}
+        results = await asyncio.gather(*[self.batcher.submit(spec) for spec in specs])
+        errors = sum('error' in r for r in results)
+        self.metrics.record(time.perf_counter() - start, len(specs), errors)
+        if path == '/state':
+            return (422 if errors else 200), results[0]
+        return 200, {'states': results}
+
+    async def _connection(self, reader, writer):
+        """one client connection, keep-alive until the client closes or says Connection: close"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, version = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = h.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, answer = await self.handle(method.upper(), path.split('?')[0], body)
+                payload = json.dumps(answer).encode()
+                close = headers.get('connection', '').lower() == 'close' or version.strip() == 'HTTP/1.0'
+                writer.write(f"HTTP/1.1 {status} {_reasons.get(status, 'OK')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\nConnection: {'close' if close else 'keep-alive'}"
+                             f"\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away or sent garbage, nothing to answer
+        finally:
+            writer.close()
+
+_reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 422: 'Unprocessable Entity'}
+
+async def request(host, port, method, path, body=None):
+    """
+    Tiny client for trying the service out (one request, one connection)
+    :return: (status, decoded JSON)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = b'' if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(payload)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b'\r\n', b''):
+            break
+        name, _, value = h.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    answer = json.loads(await reader.readexactly(length))
+    writer.close()
+    return status, answer
+
+async def bench(n=2000, **kwargs):
+    """starts a service on a free port, sends n single-state requests all at once and returns its metrics"""
+    service = await thermoService(**kwargs).start(port=0)
+    rng = np.random.default_rng(0)
+    p = np.exp(rng.uniform(np.log(0.1), np.log(100.0), n))
+    t = rng.uniform(20.0, 600.0, n)
+    try:
+        await request('127.0.0.1', service.port, 'POST', '/state', {'prop1': 'p', 'prop2': 't', 'val1': 1, 'val2': 200})
+        start = time.perf_counter()
+        answers = await asyncio.gather(*[request('127.0.0.1', service.port, 'POST', '/state',
+                                                 {'prop1': 'p', 'prop2': 't', 'val1': p[i], 'val2': t[i]})
+                                         for i in range(n)])
+        seconds = time.perf_counter() - start
+        status, metrics = await request('127.0.0.1', service.port, 'GET', '/metrics')
+    finally:
+        await service.close()
+    metrics['bench_seconds'] = seconds
+    metrics['bench_ok'] = sum(s == 200 for s, a in answers)
+    return metrics
+
+def main(argv=None):
+    """command line entry point"""
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for steam properties")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--window', type=float, default=0.005, help="seconds to collect requests into a batch")
+    parser.add_argument('--max-batch', type=int, default=2048, help="states per batch at most")
+    parser.add_argument('--workers', type=int, help="worker pool size, defaults to the number of CPUs")
+    parser.add_argument('--threads', action='store_true', help="thread pool instead of processes")
+    parser.add_argument('--bench', type=int, metavar='N', help="run N concurrent requests against a local instance")
+    args = parser.parse_args(argv)
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+    options = dict(window=args.window, maxBatch=args.max_batch, workers=args.workers, threads=args.threads)
+    if args.bench:
+        print(json.dumps(asyncio.run(bench(args.bench, **options)), indent=2))
+        return 0
+
+    async def serve():
+        service = await thermoService(**options).start(args.host, args.port)
+        print(f"listening on http://{args.host}:{service.port}", file=sys.stderr)
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.close()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
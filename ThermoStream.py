@@ -0,0 +1,205 @@
+"""
+Streaming states for historian data: timestamped (p, T), (p, h), ... readings from any number of sensors go in one at
+a time and states come out one at a time, so memory only depends on the number of sensors, not on how long it runs.
+One second samples barely move, so per sensor the pipeline keeps the last inputs it evaluated and their state:
+    - a reading within the deadband of those inputs gets the same state back, no library calls at all
+    - otherwise a solved pair (p-h, p-s, T-v, ...) starts its solve from the last T (or p) of that sensor
+    - anything else goes through thermoState.setState as usual
+The deadband is compared with the last evaluated inputs, not the last reading, so slow drift still gets picked up.
+
+    for out in stateStream(readings):  # readings: (time, tag, prop1, val1, prop2, val2) tuples
+        print(out.time, out.tag, out.h)
+    python ThermoStream.py historian.csv -o states.csv
+    python ThermoStream.py --simulate 2000 --seconds 30  # random walk sensors, reports if it keeps up
+"""
+
+#region imports
+import sys
+import csv
+import math
+import time
+import argparse
+import logging
+from collections import OrderedDict
+from ThermoCore import thermoState
+from SteamTables import steamTables
+import StateSolvers
+from UnitConversion import UC
+#endregion
+
+# default deadband in SI, a reading closer than this to the last evaluated one (in both values) reuses its state
+deadband = {'p': 1e-4, 't': 1e-3, 'h': 1e-3, 'u': 1e-3, 's': 1e-6, 'v': 1e-7, 'x': 1e-6}
+_solvedPairs = {(a, b) for a in ('p', 't') for b in ('h', 's', 'u', 'v')}
+_fields = ('region', 'p', 't', 'u', 'h', 's', 'v', 'x')
+
+class streamState:
+    """one state out of the pipeline, values in the units the pipeline runs in"""
+    __slots__ = ('time', 'tag', 'reused', 'error') + _fields
+
+    def __init__(self, time, tag, values, reused=False, error=''):
+        self.time = time
+        self.tag = tag
+        self.reused = reused  # True when it came straight from the sensor's last state
+        self.error = error  # message if the reading couldn't be evaluated, the values are nan then
+        self.region, self.p, self.t, self.u, self.h, self.s, self.v, self.x = values
+
+    def __repr__(self):
+        return f"streamState({self.time}, {self.tag}, {self.region}, p={self.p:.6g}, t={self.t:.6g}, h={self.h:.6g})"
+
+class streamPipeline:
+    """
+    Keeps the per sensor history and turns readings into states, see the module docstring
+    """
+    def __init__(self, SI=True, band=None, fast=None, maxSensors=100000):
+        """
+        :param SI: True if readings are in SI, False for english (states come out in the same units)
+        :param band: dict of deadband overrides per property, in the readings' units
+        :param fast: passed to thermoState/steamTables.sat
+        :param maxSensors: sensors to remember, the least recently seen one gets dropped past this
+        """
+        self.SI = SI
+        self.fast = fast
+        self.maxSensors = maxSensors
+        self.band = dict(deadband)
+        for q, val in (band or {}).items():
+            self.band[q] = val if SI else val * UC.factor(q, 'EN', 'SI')[0]  # a difference, scale only
+        self._sensors = OrderedDict()  # tag -> (prop1, prop2, val1, val2, SI values), LRU order
+        self._state = thermoState(fast=fast)
+        self.stats = {'readings': 0, 'reused': 0, 'solved': 0, 'warm': 0, 'computed': 0, 'errors': 0, 'seconds': 0.0}
+
+    def _evaluate(self, prop1, prop2, val1, val2, last):
+        """SI values tuple for one reading, the solved pairs start from the last state's unknown"""
+        if (prop1, prop2) in _solvedPairs:
+            self.stats['solved'] += 1
+            guess = None
+            if last is not None and last[:2] == (prop1, prop2):
+                guess = last[4][2] if prop1 == 'p' else last[4][1]  # t for the p pairs, p for the t pairs
+                self.stats['warm'] += 1
+            st = StateSolvers.solveState(steamTables.sat(True, self.fast), prop1, val1, prop2, val2, guess)
+            return tuple(st[name] for name in _fields)
+        self.stats['computed'] += 1
+        self._state.setState(prop1, prop2, val1, val2)
+        return tuple(getattr(self._state, name) for name in _fields)
+
+    def process(self, readings):
+        """
+        Generator turning readings into streamStates, one out per one in
+        :param readings: iterable of (time, tag, prop1, val1, prop2, val2)
+        """
+        sensors = self._sensors
+        band = self.band
+        stats = self.stats
+        toEN = None if self.SI else [UC.factor(q, 'SI', 'EN') for q in _fields[1:]]
+        for stamp, tag, prop1, val1, prop2, val2 in readings:
+            start = time.perf_counter()
+            stats['readings'] += 1
+            # p first, then t, same order setState uses
+            if prop2 == 'p' or (prop2 == 't' and prop1 != 'p'):
+                prop1, prop2, val1, val2 = prop2, prop1, val2, val1
+            last = sensors.get(tag)
+            reused, error = False, ''
+            try:
+                si1, si2 = float(val1), float(val2)
+                if not self.SI:
+                    si1, si2 = UC.convert(si1, prop1, 'EN', 'SI'), UC.convert(si2, prop2, 'EN', 'SI')
+                if (last is not None and last[:2] == (prop1, prop2) and abs(si1 - last[2]) <= band.get(prop1, 0.0)
+                        and abs(si2 - last[3]) <= band.get(prop2, 0.0)):
+                    values = last[4]
+                    reused = True
+                    stats['reused'] += 1
+                else:
+                    values = self._evaluate(prop1, prop2, si1, si2, last)
+                    if not math.isfinite(values[4]):
+                        raise ValueError("state is outside the range of the steam tables")
+                    sensors[tag] = (prop1, prop2, si1, si2, values)
+                sensors.move_to_end(tag)
+                if len(sensors) > self.maxSensors:
+                    sensors.popitem(last=False)
+            except (ValueError, ArithmeticError) as e:
+                values = ('unknown',) + (math.nan,) * 7
+                error = str(e) or type(e).__name__
+                stats['errors'] += 1
+            if toEN is not None and not error:
+                values = (values[0],) + tuple(v * a + b for v, (a, b) in zip(values[1:], toEN))
+            stats['seconds'] += time.perf_counter() - start
+            yield streamState(stamp, tag, values, reused, error)
+
+    def report(self):
+        """one line summary of stats"""
+        st = self.stats
+        rate = st['readings'] / st['seconds'] if st['seconds'] > 0 else float('inf')
+        return (f"{st['readings']} readings: {st['reused']} reused, {st['solved']} solved ({st['warm']} warm started), "
+                f"{st['computed']} direct, {st['errors']} errors, {rate:.0f} readings/s of compute")
+
+def stateStream(readings, SI=True, band=None, fast=None, maxSensors=100000):
+    """generator version of streamPipeline(...).process(readings) for when the stats aren't needed"""
+    return streamPipeline(SI, band, fast, maxSensors).process(readings)
+
+#region command line
+def readReadings(stream):
+    """(time, tag, prop1, val1, prop2, val2) rows from a CSV stream, header and blank rows skipped"""
+    for row in csv.reader(stream):
+        row = [c.strip() for c in row]
+        if len(row) < 6 or row[0].startswith('#') or row[0].lower() == 'time':
+            continue
+        yield row[0], row[1], row[2].lower(), row[3], row[4].lower(), row[5]
+
+def simulate(nSensors, seconds, seed=0):
+    """
+    Readings like a historian would hand over: every sensor once a second, half (p, T) and half (p, h),
+    each a slow random walk around its own operating point, with a flat line now and then
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    p = np.exp(rng.uniform(np.log(0.1), np.log(150.0), nSensors))
+    y = np.where(np.arange(nSensors) % 2, rng.uniform(2800.0, 3400.0, nSensors), rng.uniform(150.0, 550.0, nSensors))
+    props = ['h' if i % 2 else 't' for i in range(nSensors)]
+    for second in range(seconds):
+        moving = rng.random(nSensors) < 0.7  # the rest report the same value again
+        p = p * np.where(moving, 1 + rng.normal(0.0, 1e-4, nSensors), 1.0)
+        y = y + np.where(moving, rng.normal(0.0, 0.05, nSensors), 0.0)
+        for i in range(nSensors):
+            yield second, f"S{i}", 'p', p[i], props[i], y[i]
+
+def main(argv=None):
+    """command line entry point"""
+    parser = argparse.ArgumentParser(description="Streaming steam states for historian readings")
+    parser.add_argument('input', nargs='?', default='-', help="CSV of time,tag,prop1,val1,prop2,val2 rows, - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="where to write the states CSV, - for stdout")
+    parser.add_argument('--units', default='SI', choices=['SI', 'EN'])
+    parser.add_argument('--fast', action='store_true', help="use the interpolated saturation table")
+    parser.add_argument('--simulate', type=int, metavar='N', help="run N simulated sensors instead of reading input")
+    parser.add_argument('--seconds', type=int, default=10, help="simulated seconds of data")
+    args = parser.parse_args(argv)
+    logging.getLogger('pyXSteam').setLevel(logging.ERROR)
+    pipeline = streamPipeline(args.units == 'SI', fast=True if args.fast else None)
+
+    if args.simulate:
+        start = time.perf_counter()
+        for out in pipeline.process(simulate(args.simulate, args.seconds)):
+            pass
+        wall = time.perf_counter() - start
+        print(pipeline.report())
+        print(f"{args.seconds} s of data for {args.simulate} sensors in {wall:.2f} s wall, "
+              f"{'keeps up' if wall < args.seconds else 'falls behind'} ({args.seconds / wall:.1f}x real time)")
+        return 0
+
+    inStream = sys.stdin if args.input == '-' else open(args.input, newline='')
+    outStream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        writer = csv.writer(outStream, lineterminator='\n')
+        writer.writerow(('time', 'tag') + _fields + ('reused', 'error'))
+        for out in pipeline.process(readReadings(inStream)):
+            writer.writerow((out.time, out.tag) + tuple(getattr(out, name) for name in _fields)
+                            + (int(out.reused), out.error))
+    finally:
+        if inStream is not sys.stdin:
+            inStream.close()
+        if outStream is not sys.stdout:
+            outStream.close()
+    print(pipeline.report(), file=sys.stderr)
+    return 1 if pipeline.stats['errors'] else 0
+#endregion
+
+if __name__ == "__main__":
+    sys.exit(main())
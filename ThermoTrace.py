@@ -0,0 +1,135 @@
+"""
+Timing spans and call counters for finding out where the time goes, off unless THERMO_TRACE is set:
+    THERMO_TRACE=log          spans and counters go to the 'thermo.trace' logger at INFO
+    THERMO_TRACE=json         one JSON object per line on stderr
+    THERMO_TRACE=json:trace.jsonl   same, appended to a file
+When it's off span() hands back one shared do-nothing context and countCalls() hands the table back untouched,
+so the instrumented code runs the same as before.
+
+    with ThermoTrace.span('setState', state=1):
+        ...
+    steamTable = ThermoTrace.countCalls(steamTable)  # counts steamTable.tsat_p, steamTable.h_pt, ...
+    isinstance(ThermoTrace.unwrap(steamTable), satTable)  # type checks look past the wrapper
+    ThermoTrace.flush('calculate')  # emits and clears the counters
+"""
+
+#region imports
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import nullcontext
+#endregion
+
+#region setup
+logger = logging.getLogger('thermo.trace')
+counters = {}  # 'steamTable.h_pt' -> calls since the last flush
+_lock = threading.Lock()
+_noSpan = nullcontext()
+_sink = None  # callable taking a record dict, None when tracing is off
+enabled = False
+
+def configure(mode=None):
+    """
+    Turns tracing on or off
+    :param mode: None/''/'0' for off, 'log', 'json' or 'json:<path>', defaults to the THERMO_TRACE env var
+    """
+    global _sink, enabled
+    mode = os.environ.get('THERMO_TRACE', '') if mode is None else mode
+    if mode in ('', '0', 'off'):
+        _sink = None
+    elif mode == 'log':
+        _sink = _toLog
+    elif mode == 'json' or mode.startswith('json:'):
+        path = mode[5:]
+        stream = open(path, 'a', buffering=1) if path else sys.stderr
+        _sink = lambda record: stream.write(json.dumps(record) + '\n')
+    else:
+        raise ValueError(f"Unknown THERMO_TRACE mode {mode}, use log, json or json:<path>")
+    enabled = _sink is not None
+
+def _toLog(record):
+    logger.info(" ".join(f"{k}={v}" for k, v in record.items()))
+#endregion
+
+class _span:
+    """times a with block and sends it to the sink with its fields"""
+    __slots__ = ('name', 'fields', 'start')
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        record = {'span': self.name, 'ms': round(1000 * (time.perf_counter() - self.start), 4),
+                  'thread': threading.current_thread().name}
+        record.update(self.fields)
+        if excType is not None:
+            record['error'] = excType.__name__
+        emit(record)
+        return False
+
+def span(name, **fields):
+    """context manager timing a block, e.g. span('setState', state=1, pair='p-t')"""
+    return _span(name, fields) if enabled else _noSpan
+
+def emit(record):
+    """sends a record dict to the sink, if there is one"""
+    if _sink is not None:
+        with _lock:
+            _sink(record)
+
+def count(name, n=1):
+    """bumps a counter, flush() reports them"""
+    with _lock:
+        counters[name] = counters.get(name, 0) + n
+
+def flush(label='counters'):
+    """emits the counters gathered since the last flush as one record and clears them"""
+    with _lock:
+        snapshot = dict(counters)
+        counters.clear()
+    if snapshot:
+        emit({'counters': label, **snapshot})
+
+class _countingTable:
+    """stands in for a steam table, counts every method call by name then passes it on"""
+    def __init__(self, steamTable):
+        self.table = steamTable  # the real one, see unwrap
+
+    def __getattr__(self, name):
+        attr = getattr(self.table, name)
+        if not callable(attr):
+            return attr
+        key = 'steamTable.' + name
+        def counted(*args, **kwargs):
+            count(key)
+            return attr(*args, **kwargs)
+        return counted
+
+_wrappers = {}  # id of a table -> (table, its one wrapper), the tables are shared so this stays small
+
+def countCalls(steamTable):
+    """
+    The table wrapped so its calls get counted when tracing is on, the table itself when it's off.
+    Every call for the same table hands back the same wrapper, so identity checks and caches keep working
+    """
+    if not enabled or isinstance(steamTable, _countingTable):
+        return steamTable
+    entry = _wrappers.get(id(steamTable))
+    if entry is None or entry[0] is not steamTable:
+        with _lock:
+            entry = _wrappers[id(steamTable)] = (steamTable, _countingTable(steamTable))
+    return entry[1]
+
+def unwrap(steamTable):
+    """the real table behind a countCalls wrapper (the table itself if it isn't wrapped), for type checks and keys"""
+    return steamTable.table if isinstance(steamTable, _countingTable) else steamTable
+
+configure()
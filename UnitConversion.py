@@ -1,3 +1,7 @@
+#region imports
+import numpy as np
+#endregion
+
 class UC():  # a units conversion class
     def __init__(self):
         """
@@ -55,11 +59,19 @@ class UC():  # a units conversion class
 
     #entropy conversion factors
     btuperlbF_to_kJperkgC = 4.1868
-    kJperkgc_to_btuperlbF = 1/btuperlbF_to_kJperkgC
+    kJperkgC_to_btuperlbF = 1/btuperlbF_to_kJperkgC
+    kJperkgc_to_btuperlbF = kJperkgC_to_btuperlbF  # old spelling
 
     #specific volume conversion factors
     ft3perlb_to_m3perkg = ft3_to_m3/lbf_to_kg
-    m3perkg_to_ft3perlb = ft3perlb_to_m3perkg
+    m3perkg_to_ft3perlb = 1/ft3perlb_to_m3perkg
+
+    #conversion registry, filled in under the class: (quantity, from, to) -> (scale, offset) with new = old*scale + offset
+    #quantities use the same letters as thermoState: p, t, u, h, s, v, x, plus dt for temperature differences
+    _SItoEN = {'p': (bar_to_psi, 0.0), 't': (9.0/5.0, 32.0), 'dt': (9.0/5.0, 0.0), 'u': (kJperkg_to_btuperlb, 0.0),
+               'h': (kJperkg_to_btuperlb, 0.0), 's': (kJperkgC_to_btuperlbF, 0.0), 'v': (m3perkg_to_ft3perlb, 0.0),
+               'x': (1.0, 0.0)}
+    conversions = {}
     #endregion
 
     @classmethod  # this notation allows this method to be directly used from the class by UC.viscosityEnglishToSI
@@ -133,4 +145,79 @@ class UC():  # a units conversion class
 
     @classmethod
     def F_to_C(cls, T):
-        return (T-32)*5.0/9.0
\ No newline at end of file
+        return (T-32)*5.0/9.0
+
+    @classmethod
+    def units(cls, quantity, system='SI'):
+        """
+        Unit label for a quantity
+        :param quantity: p, t, u, h, s, v, x or dt
+        :param system: 'SI' or 'EN'
+        :return: the label, like 'bar' or 'btu/lb', '' for quality
+        """
+        if quantity == 'x':
+            return ""
+        return getattr(cls, system + '_' + ('t' if quantity == 'dt' else quantity))
+
+    @classmethod
+    def factor(cls, quantity, fromUnits, toUnits):
+        """
+        :return: (scale, offset) so that value in toUnits = value in fromUnits*scale + offset
+        """
+        try:
+            return cls.conversions[(quantity, fromUnits, toUnits)]
+        except KeyError:
+            raise ValueError(f"No conversion for {quantity} from {fromUnits} to {toUnits}") from None
+
+    @classmethod
+    def convert(cls, value, quantity, fromUnits, toUnits, out=None):
+        """
+        Converts a scalar or numpy array between unit systems
+        :param value: number or array in fromUnits
+        :param quantity: p, t, u, h, s, v, x or dt
+        :param fromUnits: 'SI' or 'EN'
+        :param toUnits: 'SI' or 'EN'
+        :param out: array to write the result to, pass value itself to convert in place (no copies)
+        :return: the converted value, a float for scalar input
+        """
+        scale, offset = cls.factor(quantity, fromUnits, toUnits)
+        if out is None and np.ndim(value) == 0:
+            return float(value) * scale + offset
+        out = np.multiply(value, scale, out=out)
+        if offset:
+            np.add(out, offset, out=out)
+        return out
+
+    @classmethod
+    def convertMany(cls, values, quantities, fromUnits, toUnits, out=None):
+        """
+        Converts a bunch of different quantities in one vectorized multiply-add
+        :param values: array of values, last axis lines up with quantities
+        :param quantities: sequence of quantity letters, one per value
+        :param out: same as convert, pass values to convert in place
+        :return: array of converted values
+        """
+        factors = np.array([cls.factor(q, fromUnits, toUnits) for q in quantities])
+        out = np.multiply(values, factors[:, 0], out=out)
+        np.add(out, factors[:, 1], out=out)
+        return out
+
+    @classmethod
+    def convertColumns(cls, columns, fromUnits, toUnits):
+        """
+        Converts a set of property arrays in place, e.g. the columns of a stateBatch
+        :param columns: dict (or object with the attributes) of quantity letter -> float array
+        :return: columns
+        """
+        items = columns.items() if isinstance(columns, dict) else ((q, getattr(columns, q)) for q in cls._SItoEN
+                                                                    if hasattr(columns, q))
+        for q, col in items:
+            if q in cls._SItoEN:
+                cls.convert(col, q, fromUnits, toUnits, out=col)
+        return columns
+
+# fill in the registry both ways from the SI -> EN factors
+for _q, (_scale, _offset) in UC._SItoEN.items():
+    UC.conversions[(_q, 'SI', 'EN')] = (_scale, _offset)
+    UC.conversions[(_q, 'EN', 'SI')] = (1.0 / _scale, -_offset / _scale)
+    UC.conversions[(_q, 'SI', 'SI')] = UC.conversions[(_q, 'EN', 'EN')] = (1.0, 0.0)
@@ -0,0 +1,81 @@
+"""
+Checks IF97.py against the verification values in IAPWS R7-97(2012) and against pyXSteam (the bounds in its docstring).
+    python -m pytest -q test_IF97.py
+"""
+
+#region imports
+import numpy as np
+import pytest
+import IF97
+from IF97 import if97Table
+#endregion
+
+#region IAPWS R7-97 verification values, p in MPa and T in K
+# tables 5 and 15: (T, p, v m^3/kg, h kJ/kg, u kJ/kg, s kJ/kg*K)
+region1Values = [(300.0, 3.0, 0.100215168e-2, 0.115331273e3, 0.112324818e3, 0.392294792),
+                 (300.0, 80.0, 0.971180894e-3, 0.184142828e3, 0.106448356e3, 0.368563852),
+                 (500.0, 3.0, 0.120241800e-2, 0.975542239e3, 0.971934985e3, 0.258041912e1)]
+region2Values = [(300.0, 0.0035, 0.394913866e2, 0.254991145e4, 0.241169160e4, 0.852238967e1),
+                 (700.0, 0.0035, 0.923015898e2, 0.333568375e4, 0.301262819e4, 0.101749996e2),
+                 (700.0, 30.0, 0.542946619e-2, 0.263149474e4, 0.246861076e4, 0.517540298e1)]
+psatValues = [(300.0, 0.353658941e-2), (500.0, 0.263889776e1), (600.0, 0.123443146e2)]  # table 35
+tsatValues = [(0.1, 0.372755919e3), (1.0, 0.453035632e3), (10.0, 0.584149488e3)]  # table 36
+b23Value = (0.62315e3, 0.165291643e2)  # T, p on the region 2-3 boundary
+#endregion
+
+tol = 1e-8  # the tables are given to 9 significant digits
+
+@pytest.mark.parametrize('equation, values', [(IF97.region1, region1Values), (IF97.region2, region2Values)],
+                         ids=['region1', 'region2'])
+def test_basicEquations(equation, values):
+    for T, p, v, h, u, s in values:
+        got = equation(p, T)
+        for name, want in (('v', v), ('h', h), ('u', u), ('s', s)):
+            assert got[name] == pytest.approx(want, rel=tol), f"{name} at {T} K, {p} MPa"
+
+def test_saturationLine():
+    for T, p in psatValues:
+        assert IF97.psat(T) == pytest.approx(p, rel=tol)
+    for p, T in tsatValues:
+        assert IF97.tsat(p) == pytest.approx(T, rel=tol)
+
+def test_b23():
+    T, p = b23Value
+    assert IF97.b23p(T) == pytest.approx(p, rel=tol)
+    assert IF97.b23t(p) == pytest.approx(T, rel=tol)
+
+def test_tableUnits():
+    """the same points through if97Table, in bar and C like a pyXSteam MKS table, as arrays"""
+    tab = if97Table()
+    T, p, v, h, u, s = np.array(region1Values + region2Values).T
+    props = tab.props_pt(10.0 * p, T - 273.15)
+    for name, want in (('v', v), ('h', h), ('u', u), ('s', s)):
+        np.testing.assert_allclose(props[name], want, rtol=tol)
+    T, p = np.array(psatValues).T
+    np.testing.assert_allclose(tab.psat_t(T - 273.15), 10.0 * p, rtol=tol)
+
+def test_pyXSteam():
+    """the largest deviations from pyXSteam stay inside what the module docstring quotes"""
+    bounds = {'v_pt': 1e-13, 'u_pt': 1e-11, 'h_pt': 1e-11, 's_pt': 5e-11, 'tsat_p': 1e-13, 'psat_t': 1e-13}
+    for name, (dev, count, nanOnly) in IF97.validate(100).items():
+        assert count > 0, name
+        assert dev < bounds.get(name, 5e-11), f"{name}: {dev:.2e}"  # saturated props 1.6e-11
+
+def test_nanOnlyInRegion3():
+    """where pyXSteam has a value and if97Table has nan it's region 3, for the p-T functions and the saturated ones"""
+    import logging
+    from pyXSteam.XSteam import XSteam
+    logging.getLogger('pyXSteam').setLevel(logging.CRITICAL)
+    ref, tab = XSteam(XSteam.UNIT_SYSTEM_MKS), if97Table()
+    P, T = [a.ravel() for a in np.meshgrid(np.geomspace(0.01, 1000.0, 60), np.linspace(0.1, 799.0, 60))]
+    mismatch = np.isnan(tab.h_pt(P, T)) != np.isnan([ref.h_pt(p, t) for p, t in zip(P, T)])
+    assert mismatch.any()
+    assert np.all(IF97.region(P[mismatch] / 10.0, T[mismatch] + 273.15) == 3)
+    pSat = np.geomspace(0.0062, 220.0, 200)
+    mismatch = np.isnan(tab.hL_p(pSat)) != np.isnan([ref.hL_p(p) for p in pSat])
+    assert np.all(pSat[mismatch] > 10.0 * IF97.b23p(623.15))  # 165.29 bar
+
+def test_region3Nan():
+    tab = if97Table()
+    assert np.isnan(tab.h_pt(500.0, 400.0))  # region 3
+    assert np.isnan(tab.h_pt(10.0, 900.0))  # region 5
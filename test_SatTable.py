@@ -0,0 +1,71 @@
+"""
+Checks the error bounds satTable's docstring promises against pyXSteam, in both unit systems.
+    python -m pytest -q test_SatTable.py
+"""
+
+#region imports
+import numpy as np
+import pytest
+from SteamTables import steamTables
+from SatTable import satTable
+#endregion
+
+# the docstring's bounds, relative to pyXSteam: (p <= 0.999*pc, 0.999*pc < p < pmax)
+bounds = {'tsat_p': (1e-6, 4e-4), 'psat_t': (1e-6, 4e-4), 'vL_p': (2e-5, 4e-4), 'vL_t': (2e-5, 4e-4),
+          'v': (2e-5, 4e-4)}  # v for the two-phase mixes, it carries vL's error
+defaultBound = (5e-6, 4e-4)
+
+@pytest.fixture(scope='module', params=[True, False], ids=['SI', 'EN'])
+def table(request):
+    return satTable(steamTables.get(request.param))
+
+def test_gridMidpoints(table):
+    """midpoint of every grid interval, the worst spot for the interpolation"""
+    for name, (below, above) in table.checkErrorBounds().items():
+        lo, hi = bounds.get(name, defaultBound)
+        assert below < lo, f"{name} below 0.999*pc: {below:.2e}"
+        assert above < hi, f"{name} above 0.999*pc: {above:.2e}"
+
+def test_randomPressures(table):
+    st = table.steamTable
+    pCut = 0.999 * st.criticalPressure()
+    p = np.sort(np.exp(np.random.default_rng(0).uniform(np.log(table.pmin), np.log(table.pmax), 300)))
+    for name in ('tsat_p',) + tuple(prop + '_p' for prop in satTable.props):
+        exact = np.array([getattr(st, name)(pi) for pi in p])
+        rel = np.abs(getattr(table, name)(p) - exact) / np.abs(exact)
+        lo, hi = bounds.get(name, defaultBound)
+        assert rel[p <= pCut].max() < lo, name
+        assert rel[p > pCut].max(initial=0.0) < hi, name
+
+def test_randomTemperatures(table):
+    st = table.steamTable
+    t = np.sort(np.random.default_rng(1).uniform(table.tmin, table.tmax, 300))
+    below = table.psat_t(t) <= 0.999 * st.criticalPressure()
+    for name in ('psat_t',) + tuple(prop + '_t' for prop in satTable.props):
+        exact = np.array([getattr(st, name)(ti) for ti in t])
+        rel = np.abs(getattr(table, name)(t) - exact) / np.abs(exact)
+        lo, hi = bounds.get(name, defaultBound)
+        assert rel[below].max() < lo, name
+        assert rel[~below].max(initial=0.0) < hi, name
+
+def test_twoPhaseArrays(table):
+    """props_px and props_tx against the same quality mix of pyXSteam's saturated values"""
+    st = table.steamTable
+    rng = np.random.default_rng(2)
+    p = np.exp(rng.uniform(np.log(table.pmin), np.log(0.999 * st.criticalPressure()), 200))
+    t = rng.uniform(table.tmin, table.tsat_p(0.999 * st.criticalPressure()), 200)
+    x = rng.uniform(0.0, 1.0, 200)
+    for by, vals, props in (('_p', p, table.props_px(p, x)), ('_t', t, table.props_tx(t, x))):
+        for prop in ('v', 'u', 'h', 's'):
+            yL = np.array([getattr(st, prop + 'L' + by)(a) for a in vals])
+            yV = np.array([getattr(st, prop + 'V' + by)(a) for a in vals])
+            exact = yL + x * (yV - yL)
+            rel = np.abs(props[prop] - exact) / np.abs(exact)
+            assert rel.max() < bounds.get(prop, defaultBound)[0], prop + by
+        other = props['t'] if by == '_p' else props['p']
+        exact = [st.tsat_p(a) for a in vals] if by == '_p' else [st.psat_t(a) for a in vals]
+        np.testing.assert_allclose(other, exact, rtol=1e-6)
+
+def test_outsideRange(table):
+    assert np.isnan(table.tsat_p(table.pmin / 2))
+    assert np.isnan(table.hV_p(table.steamTable.criticalPressure() * 1.01))
@@ -0,0 +1,42 @@
+"""
+Checks the shared (h, s) inverters and region classifiers stay apart per backend, with and without tracing on.
+    python -m pytest -q test_StateInverse.py
+"""
+
+#region imports
+import pytest
+import ThermoTrace
+from ThermoCore import thermoState
+from StateInverse import stateInverter
+from StateRegions import regionClassifier
+#endregion
+
+@pytest.fixture(params=['', 'json:'], ids=['untraced', 'traced'])
+def tracing(request, tmp_path):
+    """fresh shared caches, tracing on (to a scratch file) or off, put back afterwards"""
+    mode = request.param + str(tmp_path / 'trace.jsonl') if request.param else ''
+    saved = (dict(stateInverter._shared), dict(regionClassifier._shared), regionClassifier._last)
+    stateInverter._shared.clear()
+    regionClassifier._shared.clear()
+    regionClassifier._last = (None, None, None)
+    ThermoTrace.configure(mode)
+    yield
+    ThermoTrace.configure('')
+    stateInverter._shared.clear()
+    stateInverter._shared.update(saved[0])
+    regionClassifier._shared.clear()
+    regionClassifier._shared.update(saved[1])
+    regionClassifier._last = saved[2]
+
+def test_mixedBackends(tracing):
+    """if97 builds its (h, s) inverter first (no region 3 in it), pyXSteam still finds region 3 states after"""
+    first = thermoState(backend='if97')
+    first.setState('h', 's', 3051.70, 7.1247)
+    assert first.p == pytest.approx(10.0, rel=1e-4)
+    state = thermoState(backend='pyXSteam')
+    state.setState('h', 's', 2000.0, 4.3)
+    assert state.p == pytest.approx(175.04, abs=0.01)
+    assert state.t == pytest.approx(354.69, abs=0.01)
+    assert len(stateInverter._shared) == 2
+    kinds = {key[0] for key in regionClassifier._shared}
+    assert len(kinds) == len(regionClassifier._shared) and '_countingTable' not in kinds
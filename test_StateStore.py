@@ -0,0 +1,51 @@
+"""
+Round trips through the SQLite state store.  Rows are shared between the pyXSteam and if97 backends (and read by
+fast states), so a row one of them wrote has to match what the other one works out for itself.
+    python -m pytest -q test_StateStore.py
+"""
+
+#region imports
+import math
+import pytest
+from ThermoCore import thermoState
+from StateStore import stateStore
+#endregion
+
+# regions 1, 2 and 4, where both backends evaluate
+specs = [('p', 't', 10.0, 300.0), ('p', 't', 150.0, 270.0), ('t', 'p', 25.0, 1.0), ('p', 'x', 5.0, 0.4),
+         ('t', 'x', 120.0, 0.9), ('p', 'h', 20.0, 3000.0), ('p', 's', 1.0, 2.5), ('t', 'v', 300.0, 0.05)]
+props = ('p', 't', 'u', 'h', 's', 'v', 'x')
+
+def computed(spec, backend, store=None, fast=False):
+    state = thermoState(fast=fast, store=store, backend=backend)
+    state.setState(*spec)
+    return state
+
+@pytest.mark.parametrize('writer, reader', [('if97', 'pyXSteam'), ('pyXSteam', 'if97')])
+def test_sharedAcrossBackends(tmp_path, writer, reader):
+    """a row one backend saved agrees with what the other one works out itself, to the backends' ~1e-11"""
+    with stateStore(str(tmp_path / 'states.sqlite')) as store:
+        for spec in specs:
+            computed(spec, writer, store)
+        store.flush()
+        assert store.stats()['rows'] == len(specs)
+        for spec in specs:
+            hit = computed(spec, reader, store)
+            own = computed(spec, reader)
+            assert hit.region == own.region, spec
+            for q in props:
+                assert getattr(hit, q) == pytest.approx(getattr(own, q), rel=1e-9, abs=1e-12), (spec, q)
+        assert store.hits == len(specs)
+
+def test_onlyGoodRowsSaved(tmp_path):
+    """if97's nan in region 3 and interpolated fast states don't get written, pyXSteam later gets its own answer"""
+    with stateStore(str(tmp_path / 'states.sqlite')) as store:
+        region3 = ('p', 't', 250.0, 380.0)
+        assert math.isnan(computed(region3, 'if97', store).h)
+        nearCritical = ('p', 'x', 150.0, 0.3)
+        computed(nearCritical, 'pyXSteam', store, fast=True)
+        store.flush()
+        assert store.stats()['rows'] == 0
+        for spec in (region3, nearCritical):
+            state = computed(spec, 'pyXSteam', store)
+            assert state.h == computed(spec, 'pyXSteam').h